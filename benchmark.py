@@ -0,0 +1,379 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import numpy as np
+
+from datetime import datetime, timezone
+
+from .new_entries import NewEntryXMLActions
+from .new_entry_model import NewNominatimEntry, NewNominatimEntryBatch
+from .normalization import AddressNormalization
+from .id_allocator import SequentialIdAllocator
+
+
+class SyntheticAddresses:
+    """Seeded generator of US address records for offline benchmarks.
+
+    Suffixes are written out in full, as one of their USPS abbreviations or with a typo, and
+    a share of rows gets an apartment or suite and a ZIP+4 postcode. The same seed always
+    yields the same rows.
+    """
+
+    STREET_NAMES = (
+        "main", "oak", "maple", "cedar", "pine", "elm", "washington", "lake", "hill", "park", "sunset",
+        "lincoln", "jackson", "highland", "madison", "jefferson", "ridge", "walnut", "spring", "river",
+        "church", "willow", "meadow", "forest", "chestnut", "franklin", "cherry", "mill", "center", "valley",
+        "1st", "2nd", "3rd", "4th", "5th", "10th", "42nd",
+    )
+
+    SUFFIXES = (
+        "street", "avenue", "road", "drive", "lane", "court", "boulevard", "place", "way", "circle",
+        "terrace", "parkway", "trail", "highway", "square", "crossing",
+    )
+
+    # City, state, ZIP prefix and a point near its center
+    CITIES = (
+        ("Springfield", "IL", "627", 39.78, -89.65), ("Portland", "OR", "972", 45.52, -122.68),
+        ("Austin", "TX", "787", 30.27, -97.74), ("Columbus", "OH", "432", 39.96, -83.00),
+        ("Denver", "CO", "802", 39.74, -104.99), ("Madison", "WI", "537", 43.07, -89.40),
+        ("Raleigh", "NC", "276", 35.78, -78.64), ("Albany", "NY", "122", 42.65, -73.76),
+        ("Tucson", "AZ", "857", 32.22, -110.97), ("Richmond", "VA", "232", 37.54, -77.44),
+        ("Boise", "ID", "837", 43.62, -116.21), ("Savannah", "GA", "314", 32.08, -81.09),
+    )
+
+    UNIT_TYPES = ("apt", "unit", "ste", "#")
+
+    def __init__(
+        self,
+        seed: int = 0,
+        abbreviate_rate: float = 0.6,
+        misspell_rate: float = 0.1,
+        unit_rate: float = 0.15,
+        zip4_rate: float = 0.2,
+    ):
+        self.random = random.Random(seed)
+        self.abbreviate_rate = abbreviate_rate
+        self.misspell_rate = misspell_rate
+        self.unit_rate = unit_rate
+        self.zip4_rate = zip4_rate
+        self.abbreviations = {
+            suffix: sorted(alias for alias in AddressNormalization.US_STREET_NAMES[suffix] if alias != suffix and alias.isalpha())
+            for suffix in self.SUFFIXES
+        }
+
+    def suffix(self):
+        suffix = self.random.choice(self.SUFFIXES)
+        roll = self.random.random()
+        if roll < self.misspell_rate:
+            return self.misspell(suffix)
+        if roll < self.misspell_rate + self.abbreviate_rate and self.abbreviations[suffix]:
+            return self.random.choice(self.abbreviations[suffix])
+        return suffix
+
+    def misspell(self, word):
+        position = self.random.randrange(1, len(word))
+        kind = self.random.randrange(3)
+        if kind == 0:
+            return word[:position] + word[position + 1:]
+        if kind == 1:
+            return word[:position] + word[position - 1] + word[position:]
+        return word[:position - 1] + word[position] + word[position - 1] + word[position + 1:]
+
+    def record(self) -> dict:
+        rand = self.random
+        city, state, zip_prefix, lat, lon = rand.choice(self.CITIES)
+        postcode = f"{zip_prefix}{rand.randrange(100):02d}"
+        if rand.random() < self.zip4_rate:
+            postcode += f"-{rand.randrange(10_000):04d}"
+        unit = None
+        if rand.random() < self.unit_rate:
+            unit_type = rand.choice(self.UNIT_TYPES)
+            unit = f"{unit_type}{'' if unit_type == '#' else ' '}{rand.randrange(1, 400)}"
+        name = rand.choice(self.STREET_NAMES)
+        return {
+            "housenumber": str(rand.randrange(1, 20_000)),
+            "street": f"{name.title() if name.isalpha() else name} {self.suffix().title()}",
+            "unit": unit,
+            "postcode": postcode,
+            "city": city,
+            "state": state,
+            "lat": round(lat + rand.uniform(-0.1, 0.1), 7),
+            "lon": round(lon + rand.uniform(-0.1, 0.1), 7),
+        }
+
+    def records(self, count: int) -> list[dict]:
+        return [self.record() for _ in range(count)]
+
+    @staticmethod
+    def full_address(record: dict) -> str:
+        unit = f" {record['unit']}" if record.get("unit") else ""
+        return f"{record['housenumber']} {record['street']}{unit}, {record['city']}, {record['state']} {record['postcode']}"
+
+
+class PeakMemory:
+    """Peak resident set size of this process since the last `reset`.
+
+    On Linux the kernel's high-water mark is reset through /proc/self/clear_refs, so each
+    stage reports its own peak. Elsewhere only the process-wide peak is available.
+    """
+
+    @staticmethod
+    def reset():
+        try:
+            with open("/proc/self/clear_refs", "w") as clear_refs:
+                clear_refs.write("5")
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def peak_mb():
+        try:
+            with open("/proc/self/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Benchmark:
+    """Throughput, per-record latency and peak memory of the normalization and writing stages.
+
+    Each stage gets its own synthetic rows from the same seed. Per-record stages report p50/p99
+    latency and their throughput counts only the time inside the timed calls; `create_new_entry`
+    runs the whole batch pipeline and only reports throughput.
+    """
+
+    STAGES = ("parse_address", "expand_street_type", "parsed_as_addr", "populate_entry", "create_new_entry")
+
+    DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+    def __init__(self, seed: int = 0, stages=STAGES, batch_size: int = 10_000):
+        unknown = set(stages) - set(self.STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages {sorted(unknown)}, expected some of {self.STAGES}")
+        self.seed = seed
+        self.stages = tuple(stages)
+        self.batch_size = batch_size
+
+    def run(self, sizes=DEFAULT_SIZES, progress=None):
+        """Run every stage at every size.
+        Args:
+            sizes (Iterable[int], optional): Row counts. Defaults to 1k, 100k and 1M.
+            progress (TextIO, optional): Stream to report each finished stage on.
+        Returns:
+            A JSON-serializable dict of environment details and per size, per stage results.
+        """
+        results = {}
+        for size in sizes:
+            records = SyntheticAddresses(self.seed).records(size)
+            results[str(size)] = {}
+            for stage in self.stages:
+                AddressNormalization.clear_street_type_cache()
+                result = self.measure(getattr(self, f"bench_{stage}"), records)
+                results[str(size)][stage] = result
+                if progress is not None:
+                    print(f"{size:>9} {stage:<20} {result['rows_per_sec']:>12.1f} rows/sec", file=progress)
+        return {
+            "created": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "seed": self.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "results": results,
+        }
+
+    @staticmethod
+    def measure(bench, records):
+        PeakMemory.reset()
+        started = time.perf_counter()
+        latencies_ns, errors = bench(records)
+        seconds = time.perf_counter() - started
+        if latencies_ns is not None:
+            seconds = latencies_ns.sum() / 1e9
+        result = {
+            "rows": len(records),
+            "seconds": round(float(seconds), 4),
+            "rows_per_sec": round(float(len(records) / seconds), 1) if seconds else 0.0,
+            "p50_us": None,
+            "p99_us": None,
+            "peak_rss_mb": PeakMemory.peak_mb(),
+            "errors": errors,
+        }
+        if latencies_ns is not None and len(latencies_ns):
+            p50, p99 = np.percentile(latencies_ns, (50, 99)) / 1000
+            result["p50_us"] = round(float(p50), 2)
+            result["p99_us"] = round(float(p99), 2)
+        return result
+
+    @staticmethod
+    def _timed(function, values):
+        latencies = np.empty(len(values), dtype=np.int64)
+        errors = 0
+        clock = time.perf_counter_ns
+        for position, value in enumerate(values):
+            start = clock()
+            try:
+                function(value)
+            except Exception:
+                errors += 1
+            latencies[position] = clock() - start
+        return latencies, errors
+
+    def bench_parse_address(self, records):
+        addresses = [SyntheticAddresses.full_address(record) for record in records]
+        return self._timed(AddressNormalization.parse_address, addresses)
+
+    def bench_expand_street_type(self, records):
+        suffixes = [record["street"].rsplit(" ", 1)[-1] for record in records]
+        street_names = AddressNormalization.US_STREET_NAMES
+        return self._timed(lambda value: AddressNormalization.expand_street_type(value, street_names), suffixes)
+
+    def bench_parsed_as_addr(self, records):
+        # Parsing happens outside the timed calls, which build every derived field as the eager version did
+        latencies = np.empty(len(records), dtype=np.int64)
+        errors = 0
+        clock = time.perf_counter_ns
+        for position, record in enumerate(records):
+            try:
+                tagging, address_type = AddressNormalization.parse_address(SyntheticAddresses.full_address(record))
+            except Exception:
+                errors += 1
+                latencies[position] = 0
+                continue
+            parsed = (tagging, address_type)
+            start = clock()
+            try:
+                AddressNormalization.parsed_as_addr(parsed).to_dict()
+            except Exception:
+                errors += 1
+            latencies[position] = clock() - start
+        return latencies, errors
+
+    def bench_populate_entry(self, records):
+        entries = [NewNominatimEntry(**record) for record in records]
+        allocator = SequentialIdAllocator(-1, step=-1)
+
+        async def populate():
+            latencies = np.empty(len(entries), dtype=np.int64)
+            errors = 0
+            clock = time.perf_counter_ns
+            for position, entry in enumerate(entries):
+                start = clock()
+                try:
+                    await NewEntryXMLActions.populate_entry(entry, id_allocator=allocator)
+                except Exception:
+                    errors += 1
+                latencies[position] = clock() - start
+            return latencies, errors
+
+        return asyncio.run(populate())
+
+    def bench_create_new_entry(self, records):
+        batch = NewNominatimEntryBatch.from_records(records)
+        with tempfile.TemporaryDirectory() as directory:
+            result = asyncio.run(NewEntryXMLActions.create_new_entry(
+                batch,
+                os.path.join(directory, "benchmark.osm.pbf"),
+                batch_size=self.batch_size,
+                id_allocator=SequentialIdAllocator(-1, step=-1),
+                rejects=os.path.join(directory, "rejects.jsonl"),
+            ))
+        return None, result["rejects"]["rejected"]
+
+    # Cold import budgets in milliseconds; usaddress, rapidfuzz, osmium and numpy load on first use
+    IMPORT_BUDGETS_MS = {"normalization": 20.0, "new_entries": 120.0}
+
+    @classmethod
+    def import_times(cls, modules=IMPORT_BUDGETS_MS, repeat: int = 3):
+        """Best-of-`repeat` cumulative import time in milliseconds of each package module, each
+        measured with `-X importtime` in a fresh interpreter.
+        """
+        times = {}
+        for module in modules:
+            best = None
+            for _ in range(repeat):
+                completed = subprocess.run(
+                    [sys.executable, "-X", "importtime", "-c", f"import {__package__}.{module}"],
+                    capture_output=True, text=True, check=True,
+                )
+                # The requested module finishes importing last: "import time: self | cumulative | name"
+                cumulative_ms = int(completed.stderr.strip().splitlines()[-1].split("|")[1]) / 1000
+                best = cumulative_ms if best is None else min(best, cumulative_ms)
+            times[module] = round(best, 2)
+        return times
+
+    @classmethod
+    def check_import_budgets(cls, times, budgets=IMPORT_BUDGETS_MS):
+        return [
+            {"module": module, "import_ms": times[module], "budget_ms": budget}
+            for module, budget in budgets.items()
+            if module in times and times[module] > budget
+        ]
+
+    @staticmethod
+    def compare(current, baseline, threshold: float = 0.1):
+        """Stages whose throughput fell by more than `threshold` (a fraction) against `baseline`.
+        Only sizes and stages present in both runs are compared.
+        Returns:
+            A list of dicts with the size, stage, both throughputs and the relative change.
+        """
+        regressions = []
+        for size, stages in current["results"].items():
+            for stage, result in stages.items():
+                before = baseline["results"].get(size, {}).get(stage)
+                if not before or not before["rows_per_sec"]:
+                    continue
+                change = result["rows_per_sec"] / before["rows_per_sec"] - 1
+                if change < -threshold:
+                    regressions.append({
+                        "size": size,
+                        "stage": stage,
+                        "baseline_rows_per_sec": before["rows_per_sec"],
+                        "rows_per_sec": result["rows_per_sec"],
+                        "change": round(change, 4),
+                    })
+        return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark address normalization and OSM writing on synthetic rows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(Benchmark.DEFAULT_SIZES))
+    parser.add_argument("--stages", nargs="+", choices=Benchmark.STAGES, default=list(Benchmark.STAGES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("-o", "--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed throughput drop, default 0.1 (10%%)")
+    parser.add_argument("--skip-imports", action="store_true", help="do not measure cold import times")
+    args = parser.parse_args(argv)
+
+    results = Benchmark(args.seed, args.stages, args.batch_size).run(args.sizes, progress=sys.stderr)
+    if not args.skip_imports:
+        results["import_ms"] = Benchmark.import_times()
+        results["import_budget_exceeded"] = Benchmark.check_import_budgets(results["import_ms"])
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            results["regressions"] = Benchmark.compare(results, json.load(baseline), args.threshold)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    print(json.dumps(results, indent=2))
+    if results.get("regressions") or results.get("import_budget_exceeded"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import os
+import json
+
+from datetime import datetime, timezone
+
+from .id_allocator import SequentialIdAllocator
+
+
+class ImportCheckpoint:
+    """Progress of a sharded `create_new_entry` run, saved as JSON at every shard boundary.
+
+    A shard is only recorded once it is closed, together with the input offset and first node ID
+    of the batch being written at that moment and how many of that batch's entries the closed
+    shards already hold. Resuming re-normalizes that batch from the same input offset, skips the
+    entries already written and reuses the run's node IDs and timestamp, so the output is the same
+    as that of an uninterrupted run.
+    """
+
+    VERSION = 1
+
+    # create_new_entry options that must not change between a run and its resumption
+    OPTIONS = ("filename", "batch_size", "output_format", "shard_nodes", "shard_bytes", "on_invalid_location",
+               "deduplicate", "structured")
+
+    def __init__(self, path, state=None):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def open(cls, path):
+        """Load the checkpoint at `path`, or prepare a new one if there is none yet."""
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as checkpoint:
+            state = json.load(checkpoint)
+        if state.get("version") != cls.VERSION:
+            raise ValueError(f"Checkpoint {path!r} has version {state.get('version')}, expected {cls.VERSION}")
+        return cls(path, state)
+
+    @property
+    def resuming(self):
+        return self.state is not None
+
+    @property
+    def complete(self):
+        return self.resuming and self.state["complete"]
+
+    @property
+    def result(self):
+        return self.state["result"]
+
+    @property
+    def filename(self):
+        return self.state["options"]["filename"]
+
+    @property
+    def timestamp(self):
+        return self.state["timestamp"]
+
+    @property
+    def input_offset(self):
+        return self.state["input_offset"]
+
+    @property
+    def skip_entries(self):
+        return self.state["skip_entries"]
+
+    @property
+    def files(self):
+        return self.state["files"]
+
+    @property
+    def totals(self):
+        return self.state["totals"]
+
+    @property
+    def bytes_ratio(self):
+        return self.state.get("bytes_ratio", 1.0)
+
+    def begin(self, options, id_allocator=None):
+        """Start a new run or check that `options` match the checkpointed one.
+        Args:
+            options (dict): The run's values for `OPTIONS`; a None filename takes the checkpointed one.
+            id_allocator (SequentialIdAllocator, optional): Allocator of a new run. Defaults to one based on the time.
+        Returns:
+            The node ID allocator to use, positioned at the checkpoint when resuming.
+        """
+        options = {name: options[name] for name in self.OPTIONS}
+        if id_allocator is not None and not isinstance(id_allocator, SequentialIdAllocator):
+            raise ValueError("Checkpointed runs need a SequentialIdAllocator to hand out the same IDs again")
+
+        if self.resuming:
+            if options["filename"] is None:
+                options["filename"] = self.filename
+            changed = [name for name in self.OPTIONS if options[name] != self.state["options"][name]]
+            if changed:
+                raise ValueError(f"Cannot resume {self.path!r}, options changed since the checkpoint: {changed}")
+            allocator = self.state["id_allocator"]
+            return SequentialIdAllocator(allocator["next_id"], allocator["step"], allocator["stop"])
+
+        id_allocator = SequentialIdAllocator.from_timestamp() if id_allocator is None else id_allocator
+        self.state = {
+            "version": self.VERSION,
+            "options": options,
+            "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "id_allocator": {"next_id": id_allocator.reserve(0).start, "step": id_allocator.step, "stop": id_allocator.stop},
+            "input_offset": 0,
+            "skip_entries": 0,
+            "files": [],
+            "totals": None,
+            "complete": False,
+            "result": None,
+        }
+        self.save()
+        return id_allocator
+
+    def shard_completed(self, files, input_offset, next_id, skip_entries, totals, bytes_ratio=1.0):
+        """Record closed shards `files`; the batch starting at `input_offset` had node IDs from `next_id`
+        and `skip_entries` of its entries are in those shards. `bytes_ratio` is the writer's, see
+        `ShardedOsmWriter`."""
+        for path in files[len(self.state["files"]):]:
+            # The shard must be on disk before the checkpoint says it is complete
+            with open(path, "rb") as shard:
+                os.fsync(shard.fileno())
+        self.state.update(
+            files=list(files), input_offset=input_offset, skip_entries=skip_entries, totals=totals,
+            bytes_ratio=bytes_ratio,
+        )
+        self.state["id_allocator"]["next_id"] = next_id
+        self.save()
+
+    def finish(self, result):
+        self.state.update(complete=True, result=result)
+        self.save()
+
+    def save(self):
+        # Write a temporary file next to the checkpoint and rename it over, so a crash leaves either
+        # the old or the new checkpoint, never a truncated one
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as checkpoint:
+            json.dump(self.state, checkpoint, indent=2)
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+        os.replace(temporary, self.path)
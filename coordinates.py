@@ -0,0 +1,77 @@
+from .lazy import np
+
+
+class CoordinateCheck:
+    """Per-row result of `CoordinateValidation.check`.
+
+    `status` holds a bit mask of `CoordinateValidation` flags per row (0 means valid) and
+    `lat_fixed`/`lon_fixed` the coordinates in OSM's 7-decimal fixed-point form, 0 for invalid rows.
+    """
+
+    __slots__ = ('status', 'lat_fixed', 'lon_fixed')
+
+    def __init__(self, status, lat_fixed, lon_fixed):
+        self.status = status
+        self.lat_fixed = lat_fixed
+        self.lon_fixed = lon_fixed
+
+    @property
+    def valid(self):
+        return self.status == 0
+
+    def locations(self):
+        """(lon, lat) float pairs rounded to the fixed-point grid, in the order osmium expects."""
+        return list(zip(
+            (self.lon_fixed / CoordinateValidation.FIXED_POINT_SCALE).tolist(),
+            (self.lat_fixed / CoordinateValidation.FIXED_POINT_SCALE).tolist(),
+        ))
+
+    def counts(self):
+        counts = {"total": int(np.count_nonzero(self.status))}
+        for name, flag in CoordinateValidation.FLAG_NAMES.items():
+            counts[name] = int(np.count_nonzero(self.status & flag))
+        return counts
+
+
+class CoordinateValidation:
+
+    MISSING = 1
+    OUT_OF_RANGE = 2
+    NULL_ISLAND = 4
+    SWAPPED = 8
+
+    FLAG_NAMES = {"missing": MISSING, "out_of_range": OUT_OF_RANGE, "null_island": NULL_ISLAND, "swapped": SWAPPED}
+
+    FIXED_POINT_SCALE = 10_000_000
+
+    @classmethod
+    def check(cls, lat, lon, null_island_tolerance: float = 1e-6) -> CoordinateCheck:
+        """Validate whole coordinate arrays at once.
+        Args:
+            lat (array-like): Latitudes, NaN or None for missing values.
+            lon (array-like): Longitudes, NaN or None for missing values.
+            null_island_tolerance (float, optional): Distance in degrees from (0, 0) treated as null island.
+        Returns:
+            A CoordinateCheck with status flags and fixed-point coordinates per row.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        status = np.zeros(lat.shape, dtype=np.uint8)
+
+        missing = np.isnan(lat) | np.isnan(lon)
+        status[missing] |= cls.MISSING
+
+        with np.errstate(invalid='ignore'):
+            lat_out = np.abs(lat) > 90
+            lon_out = np.abs(lon) > 180
+            status[lat_out | lon_out] |= cls.OUT_OF_RANGE
+            # A latitude that only fits as a longitude, with the longitude fitting as a latitude
+            status[lat_out & ~lon_out & (np.abs(lat) <= 180) & (np.abs(lon) <= 90)] |= cls.SWAPPED
+            status[(np.abs(lat) <= null_island_tolerance) & (np.abs(lon) <= null_island_tolerance)] |= cls.NULL_ISLAND
+
+        valid = status == 0
+        lat_fixed = np.zeros(lat.shape, dtype=np.int64)
+        lon_fixed = np.zeros(lon.shape, dtype=np.int64)
+        lat_fixed[valid] = np.rint(lat[valid] * cls.FIXED_POINT_SCALE)
+        lon_fixed[valid] = np.rint(lon[valid] * cls.FIXED_POINT_SCALE)
+        return CoordinateCheck(status, lat_fixed, lon_fixed)
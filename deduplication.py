@@ -0,0 +1,175 @@
+import math
+
+from itertools import product
+
+from .lazy import np
+from .normalization import AddressNormalization
+
+
+class DuplicateResult:
+    """Per-row outcome of `DuplicateDetector.find`.
+
+    `duplicate_of[i]` is the number of the first row that row `i` duplicates, counting the rows of
+    every `find` call of the detector so far, or -1, and `keep` says whether the row should be
+    written under the detector's policy. For the "merge" policy `lat`/`lon` hold the group centroid
+    on every kept row.
+    """
+
+    __slots__ = ('duplicate_of', 'keep', 'lat', 'lon', 'exact', 'near')
+
+    def __init__(self, duplicate_of, keep, lat, lon, exact, near):
+        self.duplicate_of = duplicate_of
+        self.keep = keep
+        self.lat = lat
+        self.lon = lon
+        self.exact = exact
+        self.near = near
+
+    def counts(self):
+        return {"exact": self.exact, "near": self.near, "removed": int(np.count_nonzero(~self.keep))}
+
+
+class DuplicateDetector:
+    """Finds repeated addresses in a single pass, across all the batches it is given in turn.
+
+    Exact duplicates share the normalized `FullSearchable` string built by `parsed_as_addr`.
+    Near duplicates share house number, street name, expanded street type, directionals and
+    postcode and lie within `radius_m` metres of each other; candidates are found through a hash
+    of cells `radius_m` wide on a 3D grid over the earth's surface, so each row is only compared
+    with rows in its own and the 26 neighbouring cells.
+
+    The first row of every distinct address is kept in memory until `reset`, so copies any number
+    of batches apart are found. `policy` is "first" (drop later copies), "merge" (drop later copies
+    and move the kept row to the centroid of the copies in its own batch, as it is written before
+    later batches come in) or "report" (write everything, only count).
+    """
+
+    POLICIES = ("first", "merge", "report")
+
+    EARTH_RADIUS_M = 6_371_008.8
+
+    NEIGHBOURS = tuple(product((-1, 0, 1), repeat=3))
+
+    # Directionals as the tagger leaves them, spelled out or abbreviated, to one form
+    DIRECTIONALS = {
+        "north": "n", "south": "s", "east": "e", "west": "w",
+        "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+    }
+
+    def __init__(self, policy: str = "first", radius_m: float = 25.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown duplicate policy {policy!r}, expected one of {self.POLICIES}")
+        self.policy = policy
+        self.radius_m = radius_m
+        self.reset()
+
+    def reset(self):
+        """Forget every row seen so far."""
+        self.rows = 0
+        self._first_by_key = {}
+        # near key -> cell -> [(row, lat, lon), ...]
+        self._grid = {}
+
+    @classmethod
+    def address_keys(cls, parsed, entry) -> tuple[str | None, str]:
+        """Exact and near-duplicate keys for an entry from its `parse_address` result.
+        The street comes from the parse; city, state and postcode from the entry's own fields,
+        since `create_full_str` leaves the city out and the tagger then shifts those labels.
+        """
+        addr = dict(parsed[0])
+        addr['PlaceName'] = str(entry.city)
+        addr['StateName'] = str(entry.state)
+        addr['ZipCode'] = str(entry.postcode)
+        try:
+            exact = AddressNormalization.parsed_as_addr((addr, parsed[1]))['FullSearchable'].lower()
+        except (KeyError, TypeError, AttributeError):
+            exact = None
+        # The street type is expanded by now, so different spellings of one suffix already agree
+        directionals = [
+            (value := (addr.get(name) or '').lower()) and cls.DIRECTIONALS.get(value, value)
+            for name in ('StreetNamePreDirectional', 'StreetNamePostDirectional')
+        ]
+        near = "|".join([
+            addr.get('AddressNumber', ''), directionals[0], addr.get('StreetName', ''),
+            addr.get('StreetNamePostType') or '', directionals[1], addr['ZipCode'].strip()[:5],
+        ]).lower()
+        return exact, near
+
+    def find(self, exact_keys, near_keys, lat, lon) -> DuplicateResult:
+        """Find the duplicates among these rows and the rows of earlier calls."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        size = len(lat)
+        start = self.rows
+        duplicate_of = np.full(size, -1, dtype=np.int64)
+        exact = near = 0
+
+        cells = self.cells(lat, lon)
+        lat_list = lat.tolist()
+        lon_list = lon.tolist()
+
+        first_by_key = self._first_by_key
+        grid = self._grid
+        for row, cell in enumerate(cells):
+            number = start + row
+            key = exact_keys[row]
+            if key is not None:
+                first = first_by_key.setdefault(key, number)
+                if first != number:
+                    duplicate_of[row] = first
+                    exact += 1
+                    continue
+
+            near_key = near_keys[row]
+            key_cells = grid.get(near_key)
+            match = None
+            if key_cells is not None:
+                match = self._near_match(key_cells, cell, lat_list[row], lon_list[row])
+            if match is not None:
+                duplicate_of[row] = match
+                near += 1
+                if key is not None:
+                    first_by_key[key] = match
+            else:
+                if key_cells is None:
+                    key_cells = grid[near_key] = {}
+                key_cells.setdefault(cell, []).append((number, lat_list[row], lon_list[row]))
+        self.rows += size
+
+        keep = duplicate_of < 0 if self.policy != "report" else np.ones(size, dtype=bool)
+        merged_lat, merged_lon = lat, lon
+        if self.policy == "merge" and size:
+            # Centroid of each group with its first row in this call, indexed by that row; copies of
+            # rows from earlier calls are only dropped, those rows are written already
+            group = np.where(duplicate_of >= start, duplicate_of - start, np.arange(size))
+            counts = np.bincount(group, minlength=size)
+            merged_lat = np.where(keep, np.bincount(group, lat, minlength=size) / np.maximum(counts, 1), lat)
+            merged_lon = np.where(keep, np.bincount(group, lon, minlength=size) / np.maximum(counts, 1), lon)
+        return DuplicateResult(duplicate_of, keep, merged_lat, merged_lon, exact, near)
+
+    def cells(self, lat, lon) -> list[tuple[int, int, int]]:
+        """Grid cells of points from their position on the sphere in metres. A chord is never
+        longer than its arc, so points within `radius_m` lie at most one cell apart along every
+        axis, at any latitude and whichever batch they come in."""
+        phi = np.radians(lat)
+        lam = np.radians(lon)
+        scale = self.EARTH_RADIUS_M / self.radius_m
+        x = np.floor(scale * np.cos(phi) * np.cos(lam)).astype(np.int64).tolist()
+        y = np.floor(scale * np.cos(phi) * np.sin(lam)).astype(np.int64).tolist()
+        z = np.floor(scale * np.sin(phi)).astype(np.int64).tolist()
+        return list(zip(x, y, z))
+
+    def _near_match(self, key_cells, cell, lat, lon):
+        x, y, z = cell
+        for dx, dy, dz in self.NEIGHBOURS:
+            for other, other_lat, other_lon in key_cells.get((x + dx, y + dy, z + dz), ()):
+                if self.distance_m(lat, lon, other_lat, other_lon) <= self.radius_m:
+                    return other
+        return None
+
+    @classmethod
+    def distance_m(cls, lat1, lon1, lat2, lon2):
+        phi1, phi2 = math.radians(lat1), math.radians(lat2)
+        a = (math.sin((phi2 - phi1) / 2) ** 2
+             + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+        return 2 * cls.EARTH_RADIUS_M * math.asin(math.sqrt(a))
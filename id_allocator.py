@@ -0,0 +1,76 @@
+import os
+import time
+import fcntl
+
+from abc import ABC, abstractmethod
+
+
+class NodeIdAllocator(ABC):
+    """Hands out non-overlapping blocks of node IDs."""
+
+    @abstractmethod
+    def reserve(self, count: int) -> range:
+        """Reserve `count` consecutive IDs, in the allocator's direction."""
+
+    def next_id(self) -> int:
+        return self.reserve(1)[0]
+
+
+class SequentialIdAllocator(NodeIdAllocator):
+    """Counts from `base` in steps of `step` within this process.
+
+    Use `step=-1` for the negative ID range of new, not-yet-uploaded OSM objects, and `stop`
+    to keep several runs inside separate, pre-agreed ranges.
+    """
+
+    def __init__(self, base: int, step: int = 1, stop: int | None = None):
+        if step not in (1, -1):
+            raise ValueError("step must be 1 or -1")
+        self.step = step
+        self.stop = stop
+        self._next = base
+
+    @classmethod
+    def from_timestamp(cls):
+        return cls(round(time.time() * 1000))
+
+    def reserve(self, count: int) -> range:
+        block = range(self._next, self._next + count * self.step, self.step)
+        if self.stop is not None and count and (block[-1] - self.stop) * self.step >= 0:
+            raise ValueError(f"ID range exhausted, cannot reserve {count} IDs before {self.stop}")
+        self._next += count * self.step
+        return block
+
+
+class FileLockIdAllocator(NodeIdAllocator):
+    """Reserves blocks from a counter file under an exclusive lock, so parallel processes and
+    later runs sharing the file never hand out the same ID twice.
+
+    The counter starts at `start` (by default the current time in milliseconds) the first time
+    the file is created.
+    """
+
+    def __init__(self, path: str, start: int | None = None, step: int = 1):
+        if step not in (1, -1):
+            raise ValueError("step must be 1 or -1")
+        self.path = path
+        self.start = start
+        self.step = step
+
+    def reserve(self, count: int) -> range:
+        with open(self.path, "a+") as counter:
+            fcntl.flock(counter, fcntl.LOCK_EX)
+            try:
+                counter.seek(0)
+                stored = counter.read().strip()
+                first = int(stored) if stored else self.start
+                if first is None:
+                    first = round(time.time() * 1000)
+                counter.seek(0)
+                counter.truncate()
+                counter.write(str(first + count * self.step))
+                counter.flush()
+                os.fsync(counter.fileno())
+            finally:
+                fcntl.flock(counter, fcntl.LOCK_UN)
+        return range(first, first + count * self.step, self.step)
@@ -0,0 +1,135 @@
+import os
+import hashlib
+
+from array import array
+
+from .lazy import np, osmium
+
+
+class AddressIndex:
+    """Compact, sorted hashes of the addresses in an existing OSM extract.
+
+    `keys` hashes an address' identity (house number, street or place, postcode, city, state,
+    country, ignoring case) and `pairs` the identity together with the exact tag values and the
+    7-decimal location. An entry whose pair hash is present is unchanged; one whose key is present
+    but pair is not has changed. Both arrays are saved as `.npy` files in a directory and
+    memory-mapped on later runs.
+    """
+
+    NEW = 0
+    UNCHANGED = 1
+    CHANGED = 2
+
+    IDENTITY_TAGS = ('addr:housenumber', 'addr:street', 'addr:postcode', 'addr:city', 'addr:state', 'addr:country')
+
+    def __init__(self, keys, pairs, path=None):
+        self.keys = keys
+        self.pairs = pairs
+        self.path = path
+
+    @staticmethod
+    def _hash64(text):
+        return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
+
+    @classmethod
+    def address_hashes(cls, tags, lon, lat):
+        """(key, pair) hashes for a node's tags, a dict or a list of (k, v) pairs, and location.
+        `addr:place` counts as the street, so an address node and its place node hash the same.
+        """
+        tags = dict(tags)
+        if 'addr:street' not in tags and 'addr:place' in tags:
+            tags['addr:street'] = tags['addr:place']
+        identity = '\x1f'.join(str(tags.get(name, '')) for name in cls.IDENTITY_TAGS)
+        extra = '\x1f'.join(
+            f"{k}={v}" for k, v in sorted(tags.items())
+            if k.startswith('addr:') and k not in cls.IDENTITY_TAGS and k != 'addr:place'
+        )
+        location = f"{round(lat * 10_000_000)},{round(lon * 10_000_000)}"
+        return cls._hash64(identity.lower()), cls._hash64(f"{identity}\x1e{extra}\x1e{location}")
+
+    @classmethod
+    def build(cls, osm_file, path=None):
+        """Scan an .osm.pbf/.osm.xml file for nodes with `addr:housenumber` and index them."""
+        handler = _AddressHandler(cls)
+        osmium.apply(osm_file, handler)
+        keys = np.unique(np.frombuffer(handler.keys, dtype=np.uint64))
+        pairs = np.unique(np.frombuffer(handler.pairs, dtype=np.uint64))
+        index = cls(keys, pairs)
+        if path is not None:
+            index.save(path)
+        return index
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'keys.npy'), self.keys)
+        np.save(os.path.join(path, 'pairs.npy'), self.pairs)
+        self.path = path
+
+    @classmethod
+    def load(cls, path):
+        return cls(
+            np.load(os.path.join(path, 'keys.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'pairs.npy'), mmap_mode='r'),
+            path,
+        )
+
+    @classmethod
+    def open(cls, path, osm_file=None):
+        """Memory-map the index at `path`, (re)building it from `osm_file` if it is missing or older."""
+        keys_file = os.path.join(path, 'keys.npy')
+        if os.path.exists(keys_file) and (
+            osm_file is None or os.path.getmtime(keys_file) >= os.path.getmtime(osm_file)
+        ):
+            return cls.load(path)
+        if osm_file is None:
+            raise FileNotFoundError(f"No address index at {path!r} and no OSM file to build it from")
+        cls.build(osm_file, path)
+        return cls.load(path)
+
+    @staticmethod
+    def _contains(sorted_hashes, hashes):
+        if not len(sorted_hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.minimum(np.searchsorted(sorted_hashes, hashes), len(sorted_hashes) - 1)
+        return sorted_hashes[positions] == hashes
+
+    def classify(self, keys, pairs):
+        """Status per entry: NEW, UNCHANGED or CHANGED."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        pairs = np.asarray(pairs, dtype=np.uint64)
+        status = np.full(len(keys), self.NEW, dtype=np.uint8)
+        status[self._contains(self.keys, keys)] = self.CHANGED
+        status[self._contains(self.pairs, pairs)] = self.UNCHANGED
+        return status
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getstate__(self):
+        # Saved indexes travel to worker processes as their path and are memory-mapped there
+        if self.path is not None:
+            return {'path': self.path}
+        return {'keys': np.asarray(self.keys), 'pairs': np.asarray(self.pairs), 'path': None}
+
+    def __setstate__(self, state):
+        if state['path'] is not None:
+            loaded = self.load(state['path'])
+            state = {'keys': loaded.keys, 'pairs': loaded.pairs, 'path': loaded.path}
+        self.__dict__.update(state)
+
+
+class _AddressHandler:
+    # Plain handler object for osmium.apply, so osmium need not be imported to define it
+
+    def __init__(self, index_type):
+        self.index_type = index_type
+        self.keys = array('Q')
+        self.pairs = array('Q')
+
+    def node(self, n):
+        if 'addr:housenumber' not in n.tags or not n.location.valid():
+            return
+        tags = {tag.k: tag.v for tag in n.tags if tag.k.startswith('addr:')}
+        key, pair = self.index_type.address_hashes(tags, n.location.lon, n.location.lat)
+        self.keys.append(key)
+        self.pairs.append(pair)
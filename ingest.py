@@ -0,0 +1,229 @@
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+
+from pydantic import TypeAdapter, ValidationError
+
+from .new_entries import NewEntryXMLActions
+from .instrumentation import Instrumentation
+from .checkpoint import ImportCheckpoint
+from .rejects import RejectList, RejectSink
+from .new_entry_model import NewNominatimEntryBatch, NewNominatimEntryRecord
+
+
+class FeedIngest:
+    """Streams CSV, JSON Lines or Parquet rows through batch validation into `create_new_entry`."""
+
+    FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+    # Validates a whole batch of plain dicts in one pydantic-core call, no model per row
+    BATCH_ADAPTER = TypeAdapter(list[NewNominatimEntryRecord])
+
+    @classmethod
+    def detect_format(cls, path):
+        for suffix, file_format in cls.FILE_FORMATS.items():
+            if path.lower().endswith(suffix):
+                return file_format
+        raise ValueError(f"Cannot tell the format of {path!r}, pass one of {sorted(set(cls.FILE_FORMATS.values()))}")
+
+    @classmethod
+    def read_batches(cls, path, file_format=None, batch_size=10_000):
+        """Yield lists of raw row dicts from a feed file without loading it whole."""
+        file_format = file_format or cls.detect_format(path)
+        if file_format == "parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as error:
+                raise ImportError("Reading Parquet feeds requires pyarrow") from error
+            for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+                yield record_batch.to_pylist()
+            return
+
+        with open(path, newline="", encoding="utf-8") as feed:
+            if file_format == "csv":
+                # Empty cells fall back to the model defaults instead of empty strings
+                rows = ({k: v for k, v in row.items() if v != ""} for row in csv.DictReader(feed))
+            elif file_format == "jsonl":
+                rows = (json.loads(line) for line in feed if line.strip())
+            else:
+                raise ValueError(f"Unknown feed format {file_format!r}")
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    @classmethod
+    def build_batch(cls, rows, rejects=None):
+        """Validate raw row dicts into a `NewNominatimEntryBatch`.
+        Args:
+            rows (list[dict]): The rows to validate.
+            rejects (RejectSink, optional): Sink for rows that fail validation, which are then left
+                out of the batch. Defaults to raising on the first batch with an invalid row.
+        """
+        try:
+            return NewNominatimEntryBatch.from_records(cls.BATCH_ADAPTER.validate_python(rows))
+        except ValidationError as error:
+            if rejects is None:
+                raise
+            invalid = cls.row_errors(error)
+        for row, messages in invalid.items():
+            rejects.reject(RejectSink.record_dict(rows[row]), "validate", "ValidationError", "; ".join(messages))
+        valid = [record for row, record in enumerate(rows) if row not in invalid]
+        return NewNominatimEntryBatch.from_records(cls.BATCH_ADAPTER.validate_python(valid))
+
+    @staticmethod
+    def row_errors(error):
+        """The messages of a batch `ValidationError` by row, such as `lat: Input should be a valid number`."""
+        invalid = {}
+        for detail in error.errors(include_url=False):
+            row, *field = detail["loc"]
+            invalid.setdefault(row, []).append(f"{'.'.join(map(str, field)) or 'row'}: {detail['msg']}")
+        return invalid
+
+    @classmethod
+    async def iter_batches(cls, path, file_format=None, batch_size=10_000, progress=None, rejects=None, skip=0):
+        """Yield validated batches of a feed file, see `build_batch` for `rejects`. Rows rejected in
+        batches that lie within the first `skip` valid rows are only counted, as a resumed run's
+        sink holds them already."""
+        for rows in cls.read_batches(path, file_format, batch_size):
+            sink = rejects if rejects is None or skip <= 0 else RejectList()
+            batch = await asyncio.to_thread(cls.build_batch, rows, sink)
+            if sink is not rejects:
+                if len(batch) <= skip:
+                    rejects.skip("validate", len(sink))
+                else:
+                    for rejection in sink:
+                        rejects.reject(*rejection)
+            skip -= len(batch)
+            if progress is not None:
+                progress.update(len(rows))
+            yield batch
+
+    @classmethod
+    async def ingest(cls, path, filename=None, file_format=None, batch_size=10_000, progress=True, **options):
+        """Write a feed file to an OSM file.
+        Args:
+            path (str): CSV, JSON Lines or Parquet feed.
+            filename (str, optional): Output file, see `create_new_entry`.
+            file_format (str, optional): "csv", "jsonl" or "parquet". Defaults to the path's extension.
+            batch_size (int, optional): Rows read and validated at once. Defaults to 10000.
+            progress (bool, optional): Report progress on stderr. Defaults to True.
+            **options: Passed on to `create_new_entry`. With `rejects`, rows that fail validation go
+                there too, with the stage "validate". A resumed run does not write those before the
+                checkpoint again, but those the interrupted run had read ahead may appear twice.
+        Returns:
+            The `create_new_entry` result with the elapsed seconds and rows per second added.
+        """
+        reporter = ProgressReporter(enabled=progress)
+        checkpoint = options.get("checkpoint")
+        if isinstance(checkpoint, str):
+            checkpoint = options["checkpoint"] = ImportCheckpoint.open(checkpoint)
+        skip = checkpoint.input_offset if checkpoint is not None and checkpoint.resuming else 0
+        rejects = options.get("rejects")
+        owned = isinstance(rejects, str) and not (checkpoint is not None and checkpoint.complete)
+        if owned:
+            # Opened here so that validation shares it, in the mode create_new_entry would open it in
+            rejects = options["rejects"] = RejectSink(rejects, "a" if skip else "w")
+        counted = rejects.stages["validate"] if isinstance(rejects, RejectSink) else 0
+        try:
+            result = await NewEntryXMLActions.create_new_entry(
+                cls.iter_batches(path, file_format, batch_size, reporter, rejects, skip),
+                filename,
+                **options,
+            )
+        finally:
+            if owned:
+                rejects.close()
+        if isinstance(rejects, RejectSink) and "rejects" in result:
+            # create_new_entry counts the rows it was given; add those that never got there
+            if validated := rejects.stages["validate"] - counted:
+                result["rejects"]["rejected"] += validated
+                result["rejects"]["stages"]["validate"] = validated
+                if checkpoint is not None:
+                    checkpoint.finish(result)
+        result.update(reporter.finish())
+        return result
+
+
+class ProgressReporter:
+
+    def __init__(self, enabled=True, interval=5.0, stream=sys.stderr):
+        self.enabled = enabled
+        self.interval = interval
+        self.stream = stream
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def update(self, rows):
+        self.rows += rows
+        now = time.perf_counter()
+        if self.enabled and now - self._last_report >= self.interval:
+            self._last_report = now
+            print(f"{self.rows} rows, {self.rows / (now - self.started):.0f} rows/sec", file=self.stream)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return {"seconds": round(elapsed, 3), "rows_per_sec": round(self.rows / elapsed, 1) if elapsed else 0.0}
+
+    def finish(self):
+        summary = self.summary()
+        if self.enabled:
+            print(f"{self.rows} rows in {summary['seconds']}s, {summary['rows_per_sec']} rows/sec", file=self.stream)
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert an address feed into an OSM import file.")
+    parser.add_argument("path", help="CSV, JSON Lines or Parquet feed")
+    parser.add_argument("-o", "--output", dest="filename", help="output file (default <uuid>.osm.xml)")
+    parser.add_argument("--format", dest="file_format", choices=sorted(set(FeedIngest.FILE_FORMATS.values())))
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--parallelism", type=int, default=1)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--output-format", choices=["xml", "pbf", "gz", "bz2"])
+    parser.add_argument("--shard-nodes", type=int)
+    parser.add_argument("--shard-bytes", type=int)
+    parser.add_argument("--checkpoint", help="checkpoint file to record progress in and resume from (needs sharding)")
+    parser.add_argument("--rejects", help="write rows that fail to validate or normalize here as JSON Lines and keep going")
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    parser.add_argument("--metrics", help="write per-stage timings and counters here, .prom for Prometheus text format")
+    parser.add_argument("--profile", help="sample stacks while running and write them here in collapsed form")
+    parser.add_argument("--profile-interval", type=float, default=0.005)
+    args = parser.parse_args(argv)
+
+    if args.metrics or args.profile:
+        Instrumentation.enable(args.profile_interval if args.profile else None)
+
+    result = asyncio.run(FeedIngest.ingest(
+        args.path,
+        args.filename,
+        args.file_format,
+        args.batch_size,
+        progress=not args.quiet,
+        parallelism=args.parallelism,
+        executor=args.executor,
+        output_format=args.output_format,
+        shard_nodes=args.shard_nodes,
+        shard_bytes=args.shard_bytes,
+        checkpoint=args.checkpoint,
+        rejects=args.rejects,
+    ))
+    if args.metrics or args.profile:
+        Instrumentation.disable()
+        if args.metrics:
+            Instrumentation.write(args.metrics)
+        if args.profile:
+            Instrumentation.write_profile(args.profile)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
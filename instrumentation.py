@@ -0,0 +1,250 @@
+import sys
+import json
+import time
+import threading
+
+from collections import Counter
+from functools import wraps
+
+from . import normalization
+from .normalization import AddressNormalization, StreetTypeIndex
+from .new_entries import NewEntryXMLActions
+
+
+class StageStats:
+
+    __slots__ = ('seconds', 'calls', 'errors')
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.errors = 0
+
+
+class Instrumentation:
+    """Opt-in timing and counters for the import pipeline stages.
+
+    `enable` wraps the instrumented functions in place and `disable` puts the originals back,
+    so nothing is measured, and nothing costs anything, while instrumentation is off. Stage
+    times are inclusive: `parse_address` includes `usaddress_tag` and `expand_street_type`.
+    Only calls in this process are counted; with `executor="process"` the worker processes'
+    own counts are not collected.
+    """
+
+    # (owner, attribute, stage name); owners are classes or modules
+    STAGES = (
+        (normalization, "tag", "usaddress_tag"),
+        (AddressNormalization, "parse_address", "parse_address"),
+        (AddressNormalization, "parse_structured", "parse_structured"),
+        (AddressNormalization, "expand_street_type", "expand_street_type"),
+        (StreetTypeIndex, "match", "fuzzy_match"),
+        (StreetTypeIndex, "match_many", "fuzzy_match_many"),
+        (AddressNormalization, "parsed_as_addr", "parsed_as_addr"),
+        (NewEntryXMLActions, "normalize_batch", "normalize_batch"),
+        (NewEntryXMLActions, "set_tags", "tag_build"),
+        (NewEntryXMLActions, "set_location", "set_location"),
+        (NewEntryXMLActions, "build_node", "build_node"),
+        (NewEntryXMLActions, "write_batch", "osm_write"),
+    )
+
+    COUNTERS = ("fuzzy_fallbacks", "structured_fallbacks", "null_location_fallbacks")
+
+    PROMETHEUS_PREFIX = "nominatim_entries"
+
+    enabled = False
+    stages = {}
+    counters = dict.fromkeys(COUNTERS, 0)
+
+    _originals = []
+    _lock = threading.Lock()
+    _profiler = None
+
+    @classmethod
+    def enable(cls, profile_interval: float | None = None):
+        """Start recording.
+        Args:
+            profile_interval (float, optional): Seconds between stack samples of all other threads.
+                Defaults to no sampling.
+        """
+        if cls.enabled:
+            return
+        for owner, name, stage in cls.STAGES:
+            raw = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+            cls._originals.append((owner, name, raw))
+            observer = cls.OBSERVERS.get(stage)
+            setattr(owner, name, cls._wrap(raw, stage, observer and getattr(cls, observer)))
+        cls.enabled = True
+        if profile_interval:
+            cls._profiler = SamplingProfiler(profile_interval)
+            cls._profiler.start()
+
+    @classmethod
+    def disable(cls):
+        while cls._originals:
+            owner, name, raw = cls._originals.pop()
+            setattr(owner, name, raw)
+        cls.enabled = False
+        if cls._profiler is not None:
+            cls._profiler.stop()
+
+    @classmethod
+    def reset(cls):
+        # Installed wrappers keep their StageStats, so zero them rather than replacing them
+        with cls._lock:
+            for stats in cls.stages.values():
+                stats.seconds, stats.calls, stats.errors = 0.0, 0, 0
+            cls.counters = dict.fromkeys(cls.COUNTERS, 0)
+            if cls._profiler is not None:
+                cls._profiler.samples.clear()
+                cls._profiler.total = 0
+
+    @classmethod
+    def _wrap(cls, raw, stage, observe):
+        kind = type(raw) if isinstance(raw, (classmethod, staticmethod)) else None
+        function = raw.__func__ if kind else raw
+        stats = cls.stages.setdefault(stage, StageStats())
+        clock = time.perf_counter
+        lock = cls._lock
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            failed = False
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                elapsed = clock() - start
+                with lock:
+                    stats.seconds += elapsed
+                    stats.calls += 1
+                    stats.errors += failed
+            if observe is not None:
+                observe(args, result)
+            return result
+
+        return kind(wrapper) if kind else wrapper
+
+    @classmethod
+    def count(cls, name, amount=1):
+        with cls._lock:
+            cls.counters[name] += amount
+
+    # Stage name to the classmethod that derives counters from a call's arguments and result
+    OBSERVERS = {
+        "fuzzy_match": "_observe_fuzzy",
+        "fuzzy_match_many": "_observe_fuzzy_many",
+        "parse_structured": "_observe_structured",
+        "set_location": "_observe_location",
+    }
+
+    @classmethod
+    def _observe_fuzzy(cls, args, result):
+        # args is (index, value, discriminator); anything but an exact alias ran the fuzzy scorer
+        index, value, discriminator = args
+        if discriminator >= 100 or value not in index.aliases:
+            cls.count("fuzzy_fallbacks")
+
+    @classmethod
+    def _observe_fuzzy_many(cls, args, result):
+        index, values, discriminator = args[:3]
+        if fuzzy := sum(discriminator >= 100 or value not in index.aliases for value in values):
+            cls.count("fuzzy_fallbacks", fuzzy)
+
+    @classmethod
+    def _observe_structured(cls, args, result):
+        if result is None:
+            cls.count("structured_fallbacks")
+
+    @classmethod
+    def _observe_location(cls, args, result):
+        if result == (0, 0):
+            cls.count("null_location_fallbacks")
+
+    @classmethod
+    def snapshot(cls):
+        """Stage timings, counters and, when sampling, the 20 most frequent stacks as a dict."""
+        with cls._lock:
+            snapshot = {
+                "stages": {
+                    name: {"seconds": round(stats.seconds, 6), "calls": stats.calls, "errors": stats.errors}
+                    for name, stats in cls.stages.items()
+                },
+                "counters": dict(cls.counters),
+            }
+        if cls._profiler is not None:
+            snapshot["profile"] = {
+                "interval": cls._profiler.interval,
+                "samples": cls._profiler.total,
+                "top_stacks": dict(cls._profiler.samples.most_common(20)),
+            }
+        return snapshot
+
+    @classmethod
+    def to_prometheus(cls):
+        snapshot = cls.snapshot()
+        prefix = cls.PROMETHEUS_PREFIX
+        lines = []
+        for metric, field, description in (
+            ("stage_seconds_total", "seconds", "Cumulative seconds spent in each pipeline stage."),
+            ("stage_calls_total", "calls", "Calls of each pipeline stage."),
+            ("stage_errors_total", "errors", "Calls of each pipeline stage that raised."),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {description}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for stage, stats in snapshot["stages"].items():
+                lines.append(f'{prefix}_{metric}{{stage="{stage}"}} {stats[field]}')
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def write(cls, path):
+        """Write the snapshot as Prometheus text format if `path` ends in .prom, else as JSON."""
+        with open(path, "w") as output:
+            if path.endswith(".prom"):
+                output.write(cls.to_prometheus())
+            else:
+                json.dump(cls.snapshot(), output, indent=2)
+
+    @classmethod
+    def write_profile(cls, path):
+        """Write the sampled stacks in collapsed form, one `frame;frame;... count` per line,
+        as read by flamegraph tools.
+        """
+        if cls._profiler is None:
+            raise ValueError("No profile was recorded, enable instrumentation with a profile_interval")
+        with open(path, "w") as output:
+            for stack, count in cls._profiler.samples.most_common():
+                output.write(f"{stack} {count}\n")
+
+
+class SamplingProfiler(threading.Thread):
+    """Daemon thread that records the Python stack of every other thread each `interval` seconds."""
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__(name="instrumentation-profiler", daemon=True)
+        self.interval = interval
+        self.samples = Counter()
+        self.total = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+                self.total += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
@@ -0,0 +1,28 @@
+import importlib
+
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """Stand-in for a module that is only imported on first attribute access.
+
+    Once loaded, the real module's namespace is copied onto the stand-in, so later attribute
+    lookups are ordinary ones and cost nothing extra.
+    """
+
+    def __init__(self, name: str, package: str | None = None):
+        super().__init__(name)
+        self._lazy_package = package
+
+    def __getattr__(self, attribute):
+        module = importlib.import_module(self.__name__, self._lazy_package)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+
+# Heavy dependencies shared by the package modules; usaddress loads its CRF model on import
+np = LazyModule("numpy")
+osmium = LazyModule("osmium")
+usaddress = LazyModule("usaddress")
+fuzz = LazyModule("rapidfuzz.fuzz")
+process = LazyModule("rapidfuzz.process")
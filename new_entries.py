@@ -1,72 +1,591 @@
-import time
-import osmium.osm
+import asyncio
 
 from uuid import uuid4
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
+from copy import deepcopy
+from functools import partial
 
+from .lazy import LazyModule, np, osmium
 from .normalization import AddressNormalization
+from .osm_writer import ShardedOsmWriter
+from .id_allocator import SequentialIdAllocator
+from .coordinates import CoordinateValidation
+from .deduplication import DuplicateDetector
+from .incremental import AddressIndex
+from .checkpoint import ImportCheckpoint
+from .rejects import RejectSink
+
+# pydantic is most of this module's import time; any batch passed in has loaded it already
+entry_model = LazyModule(".new_entry_model", __package__)
+
+_MISSING = object()
+
+
+class NormalizedBatch:
+    """Output of `normalize_batch`: (tags, location) per entry to write plus per-batch counters.
+    `rejected` holds the `RejectSink.reject` arguments of entries that failed, when collecting them.
+    `duplicate_keys` holds the `DuplicateDetector.address_keys` of each entry, when computed, or None
+    for entries kept with invalid coordinates."""
+
+    __slots__ = ('size', 'entries', 'duplicate_keys', 'invalid_locations', 'duplicates', 'incremental',
+                 'structured_fallbacks', 'rejected')
+
+    def __init__(self, size, invalid_locations):
+        self.size = size
+        self.entries = []
+        self.duplicate_keys = []
+        self.invalid_locations = invalid_locations
+        self.duplicates = {}
+        self.incremental = {}
+        self.structured_fallbacks = 0
+        self.rejected = []
 
 
 class NewEntryXMLActions:
 
     @classmethod
-    async def create_new_entry(cls, data, filename=None):
-        filename = f'{uuid4()}.osm.xml' if filename == None else filename
-        with osmium.SimpleWriter(filename) as writer:
-            entry_id = round(time.time() * 1000)
-            if isinstance(data, list):
-                for entry in data:
-                    newEntry = await cls.populate_entry(entry, entry_id)
-                    entry_id+=1
-                    writer.add_node(newEntry)
-                    writer.add_node(cls.create_place_entry(newEntry, entry_id))
-                    entry_id+=1
+    async def create_new_entry(
+        cls,
+        data,
+        filename=None,
+        batch_size=1000,
+        buffer_size=4 * 1024 * 1024,
+        parallelism=1,
+        executor="thread",
+        output_format=None,
+        shard_nodes=None,
+        shard_bytes=None,
+        id_allocator=None,
+        on_invalid_location="skip",
+        deduplicate=None,
+        existing=None,
+        structured=True,
+        checkpoint=None,
+        rejects=None,
+    ):
+        """Write an address node and a place node per entry to an OSM file.
+        Entries are normalized in batches on an executor while a single writer task
+        writes finished batches in input order, keeping the event loop free.
+        Args:
+            data: A single entry or `NewNominatimEntryBatch`, or any sync or async iterable of them.
+            filename (str, optional): Output file, or the name shards are numbered after. Defaults to `<uuid4>.osm.xml`.
+            batch_size (int, optional): Entries normalized per executor task. Defaults to 1000.
+            buffer_size (int, optional): Bytes the writer buffers before flushing to disk. Defaults to 4 MiB.
+            parallelism (int, optional): Batches normalized concurrently. Defaults to 1.
+            executor (str | Executor, optional): "thread", "process" or an existing executor. Defaults to "thread".
+            output_format (str, optional): "xml", "pbf", "gz" or "bz2". Defaults to the filename's extension.
+            shard_nodes (int, optional): Start a new numbered shard after this many nodes.
+            shard_bytes (int, optional): Start a new numbered shard once a shard reaches about this size.
+            id_allocator (NodeIdAllocator, optional): Source of node IDs. Defaults to counting up from the current time in ms.
+            on_invalid_location (str, optional): "skip", "raise" or "keep" entries whose coordinates are missing,
+                out of range, swapped or on null island. Defaults to "skip".
+            deduplicate (str | DuplicateDetector, optional): Duplicate policy across the whole input, "first",
+                "merge" or "report"; a detector given is reset first. Defaults to writing every entry.
+            existing (AddressIndex, optional): Index of an earlier extract; entries already in it unchanged are skipped.
+            structured (bool, optional): Normalize from the entry fields, re-parsing with usaddress only when
+                they are ambiguous. Defaults to True.
+            checkpoint (str | ImportCheckpoint, optional): Checkpoint file recording progress at every shard
+                boundary; needs `shard_nodes` or `shard_bytes`. If it exists the run resumes from it, given
+                the same input and options, and a finished run's result is returned as is.
+            rejects (str | RejectSink, optional): JSON Lines file or sink for entries that fail to normalize
+                or, with on_invalid_location "skip", have invalid coordinates. These are written there with
+                the failing stage and the rest of the batch goes on. Defaults to aborting on the first failure.
+        Returns:
+            The status, first output filename, all files written, the number of records and nodes written,
+            the first and last node ID used, the number of entries with invalid coordinates by reason
+            the number of duplicates found, how many entries needed the usaddress fallback and, with
+            `existing`, how many entries were new, changed or skipped and, with `rejects`, how many
+            input rows were accepted and rejected per stage.
+        """
+        if isinstance(checkpoint, str):
+            checkpoint = ImportCheckpoint.open(checkpoint)
+        if checkpoint is not None:
+            if checkpoint.complete:
+                return checkpoint.result
+            if not (shard_nodes or shard_bytes):
+                raise ValueError("Checkpoints are taken at shard boundaries, set shard_nodes or shard_bytes")
+            if filename is None and checkpoint.resuming:
+                filename = checkpoint.filename
+        filename = ShardedOsmWriter.default_filename(uuid4(), output_format) if filename == None else filename
+        loop = asyncio.get_running_loop()
+        # Normalized batches waiting for the writer; bounds memory to a few batches in flight
+        queue = asyncio.Queue(maxsize=parallelism * 2)
+        id_allocator = SequentialIdAllocator.from_timestamp() if id_allocator is None else id_allocator
+        if on_invalid_location not in ("skip", "raise", "keep"):
+            raise ValueError(f"Unknown on_invalid_location policy {on_invalid_location!r}")
+        if isinstance(deduplicate, str):
+            deduplicate = DuplicateDetector(deduplicate)
+        elif deduplicate is not None:
+            deduplicate.reset()
+        # Batches are normalized in parallel, so only their keys; the writer task sees every batch in
+        # input order and deduplicates, before looking entries up in `existing`
+        normalize = partial(
+            cls.normalize_batch,
+            on_invalid_location=on_invalid_location,
+            existing=existing if deduplicate is None else None,
+            structured=structured,
+            collect_rejects=rejects is not None,
+            duplicate_keys=deduplicate is not None,
+        )
+        totals = {
+            "records": 0,
+            "nodes": 0,
+            "id_range": [None, None],
+            "invalid_locations": dict.fromkeys(["total", *CoordinateValidation.FLAG_NAMES], 0),
+            "duplicates": dict.fromkeys(["exact", "near", "removed"], 0),
+            "incremental": dict.fromkeys(["new", "changed", "skipped"], 0),
+            "structured_fallbacks": 0,
+            "rejects": {"accepted": 0, "rejected": 0, "stages": {}},
+        }
+        timestamp = None
+        offset = 0
+        replay = 0
+        skip = 0
+        completed_files = ()
+        bytes_ratio = 1.0
+        resume = False
+        if checkpoint is not None:
+            # begin() saves a new run's state, after which it counts as resuming too
+            resume = checkpoint.resuming
+            id_allocator = checkpoint.begin({
+                "filename": filename,
+                "batch_size": batch_size,
+                "output_format": output_format,
+                "shard_nodes": shard_nodes,
+                "shard_bytes": shard_bytes,
+                "on_invalid_location": on_invalid_location,
+                "deduplicate": None if deduplicate is None else [deduplicate.policy, deduplicate.radius_m],
+                "structured": structured,
+            }, id_allocator)
+            timestamp = checkpoint.timestamp
+            offset = checkpoint.input_offset
+            skip = checkpoint.skip_entries
+            completed_files = checkpoint.files
+            bytes_ratio = checkpoint.bytes_ratio
+            totals = checkpoint.totals or totals
+            if deduplicate is None:
+                data = cls._skip_input(data, offset)
             else:
-                newEntry = await cls.populate_entry(data, entry_id)
-                writer.add_node(newEntry)
-                writer.add_node(cls.create_place_entry(newEntry, entry_id))        
-        return {
+                # Copies after the checkpoint are found against the rows before it, so those batches are
+                # normalized and deduplicated again, without writing them or counting them twice
+                replay, offset = offset, 0
+        if isinstance(rejects, str):
+            # A resumed run appends; rejections of the batch a crash interrupted are written again
+            sink = RejectSink(rejects, "a" if checkpoint is not None and checkpoint.input_offset else "w")
+        else:
+            sink = rejects
+        # Created after the arguments are checked, so a bad argument leaks no executor
+        pool = cls._make_executor(executor, parallelism)
+        write_pool = ThreadPoolExecutor(1)
+        try:
+            with ShardedOsmWriter(
+                filename, output_format, shard_nodes, shard_bytes, buffer_size, completed_files, bytes_ratio, resume
+            ) as writer:
+                producer = asyncio.create_task(cls._normalize_batches(data, batch_size, queue, pool, normalize))
+                try:
+                    while (pending := await queue.get()) is not None:
+                        normalized = await pending
+                        if deduplicate is not None:
+                            # On the writer thread, which takes batches in input order, off the event loop
+                            await loop.run_in_executor(write_pool, cls.remove_duplicates, normalized, deduplicate)
+                            if existing is not None:
+                                await loop.run_in_executor(write_pool, cls._skip_existing, normalized, existing)
+                        if offset < replay:
+                            offset += normalized.size
+                            continue
+                        if sink is not None:
+                            for rejection in normalized.rejected:
+                                sink.reject(*rejection)
+                            sink.accept(normalized.size - len(normalized.rejected))
+                        on_rollover = None
+                        if checkpoint is not None:
+                            # Runs on the writer thread while this task waits, so totals are those before this batch
+                            on_rollover = partial(cls._checkpoint_shard, checkpoint, writer, offset, deepcopy(totals))
+                        ids = await loop.run_in_executor(
+                            write_pool, cls.write_batch, writer, normalized, id_allocator, timestamp, skip, on_rollover
+                        )
+                        skip = 0
+                        offset += normalized.size
+                        if ids:
+                            id_range = totals["id_range"]
+                            totals["id_range"] = [id_range[0] if id_range[0] is not None else ids[0], ids[-1]]
+                        totals["records"] += len(normalized.entries)
+                        totals["nodes"] += 2 * len(normalized.entries)
+                        for reason, count in normalized.invalid_locations.items():
+                            totals["invalid_locations"][reason] += count
+                        for kind, count in normalized.duplicates.items():
+                            totals["duplicates"][kind] += count
+                        for kind, count in normalized.incremental.items():
+                            totals["incremental"][kind] += count
+                        totals["structured_fallbacks"] += normalized.structured_fallbacks
+                        if sink is not None:
+                            cls._count_rejects(totals["rejects"], normalized)
+                finally:
+                    producer.cancel()
+                    await asyncio.gather(producer, return_exceptions=True)
+                    # Batches queued behind a failure are abandoned; cancel them and consume their errors
+                    while not queue.empty():
+                        if (abandoned := queue.get_nowait()) is not None:
+                            abandoned.cancel()
+                            await asyncio.gather(abandoned, return_exceptions=True)
+        finally:
+            write_pool.shutdown()
+            if pool is not executor:
+                pool.shutdown(cancel_futures=True)
+            if sink is not rejects:
+                sink.close()
+            elif sink is not None:
+                sink.flush()
+        result = {
             "status": 200,
-            "filename": filename
+            "filename": writer.files[0],
+            "files": writer.files,
+            "records": totals["records"],
+            "nodes": totals["nodes"],
+            "id_range": totals["id_range"],
+            "invalid_locations": totals["invalid_locations"],
+            "duplicates": totals["duplicates"],
+            "structured_fallbacks": totals["structured_fallbacks"],
+            **({"incremental": totals["incremental"]} if existing is not None else {}),
+            **({"rejects": {"filename": sink.path, **totals["rejects"]}} if sink is not None else {}),
+        }
+        if checkpoint is not None:
+            checkpoint.finish(result)
+        return result
+
+
+    @staticmethod
+    def _count_rejects(totals, normalized):
+        totals["accepted"] += normalized.size - len(normalized.rejected)
+        totals["rejected"] += len(normalized.rejected)
+        for _, stage, _, _ in normalized.rejected:
+            totals["stages"][stage] = totals["stages"].get(stage, 0) + 1
+
+
+    @staticmethod
+    def _checkpoint_shard(checkpoint, writer, offset, totals, ids, position):
+        checkpoint.shard_completed(writer.files[:-1], offset, ids.start, position, totals, writer.bytes_ratio)
+
+
+    @classmethod
+    async def _skip_input(cls, data, count):
+        # Drops the first `count` input rows, slicing a columnar batch that straddles the offset
+        async for entry in cls.iter_entries(data):
+            if count <= 0:
+                yield entry
+            elif isinstance(entry, entry_model.NewNominatimEntryBatch):
+                if len(entry) > count:
+                    yield entry.slice(count, len(entry))
+                count -= len(entry)
+            else:
+                count -= 1
+
+
+    @staticmethod
+    def _make_executor(executor, parallelism):
+        if executor == "thread":
+            return ThreadPoolExecutor(parallelism)
+        if executor == "process":
+            return ProcessPoolExecutor(parallelism)
+        return executor
+
+
+    @classmethod
+    async def _normalize_batches(cls, data, batch_size, queue, pool, normalize):
+        loop = asyncio.get_running_loop()
+        try:
+            batch = []
+            async for entry in cls.iter_entries(data):
+                if isinstance(entry, entry_model.NewNominatimEntryBatch):
+                    # Columnar input is sliced as-is, keeping earlier loose entries in order
+                    if batch:
+                        await queue.put(loop.run_in_executor(pool, normalize, batch))
+                        batch = []
+                    for part in entry.split(batch_size):
+                        await queue.put(loop.run_in_executor(pool, normalize, part))
+                    continue
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    await queue.put(loop.run_in_executor(pool, normalize, batch))
+                    batch = []
+            if batch:
+                await queue.put(loop.run_in_executor(pool, normalize, batch))
+            await queue.put(None)
+        except Exception as error:
+            # Hand input errors to the writer in order, after the batches read before them
+            failed = loop.create_future()
+            failed.set_exception(error)
+            await queue.put(failed)
+
+
+    @staticmethod
+    async def iter_entries(data):
+        if hasattr(data, 'create_full_str') or isinstance(data, entry_model.NewNominatimEntryBatch):
+            yield data
+        elif hasattr(data, '__aiter__'):
+            async for entry in data:
+                yield entry
+        else:
+            for entry in data:
+                yield entry
+
+
+    @classmethod
+    def parse_entry(cls, data, structured=True):
+        """Normalize an entry's street and house number and build its tags.
+        The structured fields are used directly unless they are ambiguous, in which case the
+        full address string goes through `parse_address`.
+        Returns:
+            The tags, the parsed address and whether `parse_address` was needed.
+        """
+        parsed = AddressNormalization.parse_structured(data.housenumber, data.street) if structured else None
+        fallback = parsed is None
+        if fallback:
+            parsed = AddressNormalization.parse_address(data.create_full_str())
+        data = AddressNormalization.parsed_street_to_model(data, parsed)
+        return cls.set_tags(data), parsed, fallback
+
+
+    @classmethod
+    def parse_entries(cls, entries, structured=True, errors=None):
+        """`parse_entry` for a batch, tagged with `AddressNormalization.parse_entries`.
+        Args:
+            entries (list): The entries to parse.
+            structured (bool, optional): Use the structured fields where they are unambiguous. Defaults to True.
+            errors (dict, optional): Collects the error of each failed entry under its position, the
+                entry then gives None. Defaults to raising.
+        Returns:
+            The `parse_entry` result of each entry, in input order.
+        """
+        # Batches already run in parallel on the pool, so score the street types on this thread
+        parsed = AddressNormalization.parse_entries(entries, structured, workers=1, errors=errors)
+        results = []
+        for row, (entry, entry_parsed) in enumerate(zip(entries, parsed)):
+            if entry_parsed is None:
+                results.append(None)
+                continue
+            tagging, fallback = entry_parsed
+            try:
+                data = AddressNormalization.parsed_street_to_model(entry, tagging)
+                results.append((cls.set_tags(data), tagging, fallback))
+            except Exception as error:
+                if errors is None:
+                    raise
+                errors[row] = error
+                results.append(None)
+        return results
+
+
+    @classmethod
+    def normalize_tags(cls, data, structured=True):
+        return cls.parse_entry(data, structured)[0]
+
+
+    @classmethod
+    def normalize_entry(cls, data):
+        return cls.normalize_tags(data), cls.set_location(data)
+
+
+    @classmethod
+    def normalize_batch(
+        cls, entries, on_invalid_location="skip", deduplicate=None, existing=None, structured=True,
+        collect_rejects=False, duplicate_keys=False,
+    ):
+        """Normalize a batch into the tags and location of each entry to write.
+        Args:
+            entries (list | NewNominatimEntryBatch): The entries to normalize.
+            on_invalid_location (str, optional): "skip", "raise" or "keep" entries with invalid coordinates.
+                Defaults to "skip".
+            deduplicate (DuplicateDetector, optional): Drops duplicates; the detector remembers every batch
+                it was given, so batches normalized in turn with one detector are compared with each other.
+            existing (AddressIndex, optional): Skips the entries already in an earlier extract unchanged.
+            structured (bool, optional): Normalize from the entry fields where unambiguous. Defaults to True.
+            collect_rejects (bool, optional): Collect failing entries in `rejected` instead of raising.
+            duplicate_keys (bool, optional): Only compute `duplicate_keys`, for `remove_duplicates` to
+                apply later, in input order. Defaults to False.
+        Returns:
+            NormalizedBatch
+        """
+        # Coordinates are checked for the whole batch up front so bad rows never reach the CRF tagger
+        if isinstance(entries, entry_model.NewNominatimEntryBatch):
+            lat, lon = entries.lat, entries.lon
+        else:
+            lat = np.fromiter((cls._coordinate(entry, 'lat') for entry in entries), np.float64, len(entries))
+            lon = np.fromiter((cls._coordinate(entry, 'lon') for entry in entries), np.float64, len(entries))
+        check = CoordinateValidation.check(lat, lon)
+        valid = check.valid
+        if on_invalid_location == "raise" and not valid.all():
+            row = int(np.argmin(valid))
+            raise ValueError(f"Invalid coordinates ({lat[row]}, {lon[row]}) for entry {row} of the batch")
+
+        result = NormalizedBatch(len(valid), check.counts())
+        # Skipped rows are rejections too when collecting them, so accepted and rejected add up to the input
+        report_invalid = collect_rejects and on_invalid_location == "skip"
+        keep_all = on_invalid_location == "keep"
+        with_keys = duplicate_keys or deduplicate is not None
+        rows = list(zip(entries, check.locations(), valid.tolist(), check.status.tolist()))
+        errors = {} if collect_rejects else None
+        parsed = enumerate(cls.parse_entries([row[0] for row in rows if row[2] or keep_all], structured, errors))
+        for entry, location, ok, status in rows:
+            if ok or keep_all:
+                position, entry_result = next(parsed)
+                error = errors[position] if entry_result is None else None
+                keys = None
+                if error is None and with_keys and ok:
+                    # Only rows with valid coordinates are compared; kept invalid rows are written as they are
+                    try:
+                        keys = DuplicateDetector.address_keys(entry_result[1], entry)
+                    except Exception as key_error:
+                        if not collect_rejects:
+                            raise
+                        error = key_error
+                if error is not None:
+                    result.rejected.append((RejectSink.record_dict(entry), *RejectSink.describe(error)))
+                    continue
+                tags, _, fallback = entry_result
+                result.entries.append((tags, location if ok else cls.set_location(entry)))
+                if with_keys:
+                    result.duplicate_keys.append(keys)
+                result.structured_fallbacks += fallback
+            elif report_invalid:
+                result.rejected.append(cls._invalid_location_rejection(entry, status))
+        if deduplicate is not None:
+            cls.remove_duplicates(result, deduplicate)
+        if existing is not None:
+            cls._skip_existing(result, existing)
+        return result
+
+
+    @staticmethod
+    def remove_duplicates(result, detector):
+        """Drop the duplicates of a batch normalized with `duplicate_keys`, against this batch and every
+        batch the detector was given before, so batches must come in input order.
+        Args:
+            result (NormalizedBatch): The batch, changed in place.
+            detector (DuplicateDetector): The detector, whose policy decides what is dropped or moved.
+        """
+        placed = [row for row, keys in enumerate(result.duplicate_keys) if keys is not None]
+        found = detector.find(
+            [result.duplicate_keys[row][0] for row in placed],
+            [result.duplicate_keys[row][1] for row in placed],
+            [result.entries[row][1][1] for row in placed],
+            [result.entries[row][1][0] for row in placed],
+        )
+        keep = found.keep.tolist()
+        entries = result.entries
+        if detector.policy == "merge":
+            lon = np.round(found.lon, 7).tolist()
+            lat = np.round(found.lat, 7).tolist()
+            for position, row in enumerate(placed):
+                if keep[position]:
+                    entries[row] = (entries[row][0], (lon[position], lat[position]))
+        dropped = {row for position, row in enumerate(placed) if not keep[position]}
+        if dropped:
+            result.entries = [entry for row, entry in enumerate(entries) if row not in dropped]
+        result.duplicate_keys = []
+        result.duplicates = found.counts()
+
+
+    @staticmethod
+    def _skip_existing(result, existing):
+        hashes = [AddressIndex.address_hashes(tags, *location) for tags, location in result.entries]
+        status = existing.classify([key for key, _ in hashes], [pair for _, pair in hashes])
+        result.entries = [entry for entry, state in zip(result.entries, status.tolist()) if state != AddressIndex.UNCHANGED]
+        result.incremental = {
+            "new": int(np.count_nonzero(status == AddressIndex.NEW)),
+            "changed": int(np.count_nonzero(status == AddressIndex.CHANGED)),
+            "skipped": int(np.count_nonzero(status == AddressIndex.UNCHANGED)),
         }
 
 
+    @staticmethod
+    def _invalid_location_rejection(entry, status):
+        reasons = [name for name, flag in CoordinateValidation.FLAG_NAMES.items() if status & flag]
+        return RejectSink.record_dict(entry), "check_coordinates", "InvalidLocation", ", ".join(reasons)
+
+
+    @staticmethod
+    def _coordinate(entry, name):
+        value = getattr(entry, name, None)
+        return np.nan if value is None else value
+
+
     @classmethod
-    async def populate_entry(cls, data, entry_id):
-        data = AddressNormalization.parsed_street_to_model(data, AddressNormalization.parse_address(data.create_full_str()))
-        newEntry = osmium.osm.mutable.Node(
-            timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    def write_batch(cls, writer, normalized, id_allocator, timestamp=None, skip=0, on_rollover=None):
+        """Write a normalized batch, reserving its node IDs in one block.
+        Args:
+            timestamp (str, optional): Node timestamp. Defaults to the current time.
+            skip (int, optional): Leading entries already written, whose IDs are reserved but not used again.
+            on_rollover (Callable, optional): Called with the batch's IDs and the entry's position whenever
+                a new shard is started.
+        Returns:
+            The range of node IDs reserved.
+        """
+        timestamp = timestamp or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        ids = id_allocator.reserve(2 * len(normalized.entries))
+        next_id = iter(ids[2 * skip:]).__next__
+        for position, (tags, location) in enumerate(normalized.entries[skip:], skip):
+            if writer.check_rollover() and on_rollover is not None:
+                on_rollover(ids, position)
+            newEntry = cls.build_node(tags, location, next_id(), timestamp)
+            writer.add_node(newEntry)
+            writer.add_node(cls.create_place_entry(newEntry, next_id()))
+        return ids
+
+
+    @staticmethod
+    def _resolve_id(entry_id, id_allocator):
+        if entry_id is not None:
+            return entry_id
+        if id_allocator is None:
+            raise ValueError("Either entry_id or id_allocator is required")
+        return id_allocator.next_id()
+
+
+    @classmethod
+    async def populate_entry(cls, data, entry_id=None, id_allocator=None):
+        entry_id = cls._resolve_id(entry_id, id_allocator)
+        tags, location = await asyncio.get_running_loop().run_in_executor(None, cls.normalize_entry, data)
+        return cls.build_node(tags, location, entry_id)
+
+
+    @staticmethod
+    def build_node(tags, location, entry_id, timestamp=None):
+        return osmium.osm.mutable.Node(
+            timestamp = timestamp or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
             id = entry_id,
             user = "osm_imports",
             version = 1,
-            tags = cls.set_tags(data),
-            location = cls.set_location(data),
+            tags = tags,
+            location = location,
             visible = True
         )
-        return newEntry
 
 
-    @staticmethod
-    def set_tags(data):
+    TAG_KEYS = ('housenumber', 'street', 'unit', 'postcode', 'city', 'state', 'country')
+
+    @classmethod
+    def set_tags(cls, data):
         tagList = []
-        for key, value in data.__dict__.items():
-            if key in ['street', 'housenumber', 'unit', 'city', 'state', 'postcode', 'country']:
+        for key in cls.TAG_KEYS:
+            if (value := getattr(data, key, _MISSING)) is not _MISSING:
                 tagList.append(osmium.osm.Tag(f"addr:{key}", str(value)))
         return tagList
     
 
     @staticmethod
     def set_location(data):
-        datakeys = data.__dict__.keys()
-        if 'lat' in datakeys and 'lon' in datakeys:
-            return (float(data.lon), float(data.lat))
-        if data.latitude and data.longitude:
-            return (float(data.longitude), float(data.latitude))
+        lat, lon = getattr(data, 'lat', None), getattr(data, 'lon', None)
+        # Batch rows carry missing coordinates as NaN rather than None
+        if lat is not None and lon is not None and lat == lat and lon == lon:
+            return (float(lon), float(lat))
         return (0, 0)
     
     
-    def create_place_entry(entry, entry_id):
-        entry.id = entry_id
+    @classmethod
+    def create_place_entry(cls, entry, entry_id=None, id_allocator=None):
+        entry.id = cls._resolve_id(entry_id, id_allocator)
         for i in entry.tags:
             if 'addr:street' in i: 
                 entry.tags[entry.tags.index(i)] = osmium.osm.Tag("addr:place", i[1])
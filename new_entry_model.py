@@ -1,6 +1,9 @@
 from typing import Optional, Union
+from typing_extensions import NotRequired, TypedDict
 from pydantic import BaseModel, Field
 
+from .lazy import np
+
 class NewNominatimEntry(BaseModel):
     housenumber: Union[str|int]
     street: str
@@ -18,3 +21,93 @@ class NewNominatimEntry(BaseModel):
 
     def create_full_str(self):
         return f"{self.housenumber} {self.street}, {self.state}, {self.country} {self.postcode}"
+
+
+class NewNominatimEntryRecord(TypedDict):
+    """Plain-dict form of `NewNominatimEntry`, validated in bulk without building models.
+    Missing coordinates become NaN in the batch and are left to `CoordinateValidation`."""
+    housenumber: Union[str|int]
+    street: str
+    postcode: Union[str|int]
+    city: str
+    state: str
+    lat: NotRequired[Optional[float]]
+    lon: NotRequired[Optional[float]]
+    country: NotRequired[Optional[str]]
+    country_code: NotRequired[Optional[str]]
+    addresstype: NotRequired[Optional[str]]
+    buildingtype: NotRequired[Optional[str]]
+    visible: NotRequired[Optional[bool]]
+    category: NotRequired[Optional[str]]
+
+
+class NewNominatimEntryRow:
+    """Lightweight `__slots__` view of one batch row with the same attributes as `NewNominatimEntry`."""
+
+    FIELDS = tuple(NewNominatimEntry.model_fields)
+
+    __slots__ = FIELDS
+
+    def __init__(self, *values):
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+
+    create_full_str = NewNominatimEntry.create_full_str
+
+
+class NewNominatimEntryBatch:
+    """Column-oriented batch of entries: one list per text field and float64 arrays for lat/lon.
+
+    Missing optional fields take the `NewNominatimEntry` defaults. Iterating yields a short-lived
+    `NewNominatimEntryRow` per record.
+    """
+
+    FIELDS = NewNominatimEntryRow.FIELDS
+
+    DEFAULTS = {name: field.default for name, field in NewNominatimEntry.model_fields.items() if not field.is_required()}
+
+    def __init__(self, columns: dict[str, list], lat, lon):
+        self.columns = columns
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+
+    @classmethod
+    def from_records(cls, records: list[dict]):
+        columns = {}
+        for name in cls.FIELDS:
+            if name in ('lat', 'lon'):
+                continue
+            if name in cls.DEFAULTS:
+                default = cls.DEFAULTS[name]
+                columns[name] = [record.get(name, default) for record in records]
+            else:
+                columns[name] = [record[name] for record in records]
+        lat = np.fromiter((cls._coordinate(record, 'lat') for record in records), dtype=np.float64, count=len(records))
+        lon = np.fromiter((cls._coordinate(record, 'lon') for record in records), dtype=np.float64, count=len(records))
+        return cls(columns, lat, lon)
+
+    @staticmethod
+    def _coordinate(record, name):
+        value = record.get(name)
+        return np.nan if value is None else value
+
+    @classmethod
+    def from_entries(cls, entries):
+        return cls.from_records([entry.__dict__ for entry in entries])
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __iter__(self):
+        columns = [self.columns[name] if name in self.columns else getattr(self, name).tolist() for name in self.FIELDS]
+        for values in zip(*columns):
+            yield NewNominatimEntryRow(*values)
+
+    def slice(self, start, stop):
+        return NewNominatimEntryBatch(
+            {name: column[start:stop] for name, column in self.columns.items()}, self.lat[start:stop], self.lon[start:stop]
+        )
+
+    def split(self, size):
+        for start in range(0, len(self), size):
+            yield self.slice(start, start + size)
@@ -1,10 +1,302 @@
+import os
 import re
-from usaddress import tag
+from collections import deque
+from collections.abc import Mapping
+from functools import lru_cache
+from itertools import islice
 from string import punctuation
-from rapidfuzz import fuzz, process
+from typing import TYPE_CHECKING
+
+from .lazy import np, usaddress, fuzz, process
+from .rejects import RejectList, RejectSink
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+
+def tag(address):
+    # usaddress and its CRF model load on the first call
+    return usaddress.tag(address)
+
+
+class StreetTypeIndex:
+    """Flattened lookup tables built once from a street type mapping.
+
+    `aliases` maps every alternative spelling to the first key (in mapping order)
+    that lists it, and `choices`/`choice_keys` are the flat alias list scored in a
+    single fuzzy pass, with `choice_keys` holding each alias' key position.
+    """
+
+    __slots__ = ('keys', 'aliases', 'choices', 'choice_keys')
+
+    MATCH_BLOCK_SIZE = 1024
+
+    def __init__(self, street_names: dict[str, set[str]]):
+        self.keys = tuple(street_names)
+        self.aliases = {}
+        self.choices = []
+        self.choice_keys = []
+        for position, (key, alternatives) in enumerate(street_names.items()):
+            for alias in sorted(alternatives):
+                self.aliases.setdefault(alias, key)
+                self.choices.append(alias)
+                self.choice_keys.append(position)
+
+    def match(self, value: str, discriminator: float) -> str:
+        # An exact alias scores 100 and only an identical alias can tie with it
+        if discriminator < 100 and (key := self.aliases.get(value)) is not None:
+            return key
+
+        best_scores = {}
+        for _, score, choice in process.extract(
+            value, self.choices, scorer=fuzz.WRatio, score_cutoff=max(discriminator, 0), limit=None
+        ):
+            position = self.choice_keys[choice]
+            if score > discriminator and score > best_scores.get(position, -1):
+                best_scores[position] = score
+
+        if not best_scores:
+            return value
+        # Highest score wins, ties go to the key listed first in the mapping
+        return self.keys[min(best_scores, key=lambda position: (-best_scores[position], position))]
+
+    def match_many(self, values: list[str], discriminator: float, workers: int = -1) -> list[str]:
+        """`match` for many values, scoring all of them against every alias in one `cdist` call."""
+        results = list(values)
+        fuzzy = []
+        for row, value in enumerate(values):
+            if discriminator < 100 and (key := self.aliases.get(value)) is not None:
+                results[row] = key
+            else:
+                fuzzy.append(row)
+        if not fuzzy or not self.choices:
+            return results
+
+        # Aliases are grouped by key in key order, so reduceat gives each key's best alias score
+        starts = np.flatnonzero(np.diff(self.choice_keys, prepend=-1))
+        key_positions = np.asarray(self.choice_keys)[starts]
+        # Score in blocks so the float64 score matrix stays a few MB however many values come in
+        for block in range(0, len(fuzzy), self.MATCH_BLOCK_SIZE):
+            rows = fuzzy[block:block + self.MATCH_BLOCK_SIZE]
+            scores = process.cdist(
+                [values[row] for row in rows], self.choices, scorer=fuzz.WRatio,
+                score_cutoff=max(discriminator, 0), dtype=np.float64, workers=workers,
+            )
+            scores[scores <= discriminator] = -1
+            key_scores = np.maximum.reduceat(scores, starts, axis=1)
+            # argmax returns the first of equal scores, which is the key listed first in the mapping
+            best = key_scores.argmax(axis=1)
+            found = key_scores[np.arange(len(rows)), best] > discriminator
+            for row, position, ok in zip(rows, key_positions[best].tolist(), found.tolist()):
+                if ok:
+                    results[row] = self.keys[position]
+        return results
+
+
+_UNBUILT = object()
+
+
+class NormalizedAddress(dict):
+    """Result of `parsed_as_addr`: a read-only dict of a tagging plus the fields derived from it,
+    each built on first access and then kept.
+
+    Being a dict, and so a `collections.abc.Mapping`, it works with `json.dumps`, `dict(addr)` and
+    `{**addr}` like the dict `parsed_as_addr` used to return. The dict's own storage holds a copy of
+    the tagging and every method that reads it is overridden to add the derived fields, which are
+    also attributes; only code reading that storage directly from C sees the raw tagging alone, so
+    hand such code `to_dict()`. A derived field that does not apply, like `SecondaryAddress` without
+    an occupancy or `StateCode` for an unknown state, is missing from the dict and None as an
+    attribute. The tagging passed in is not modified.
+    """
+
+    DERIVED = (
+        "ZipCode", "StateCode", "FullStreetName", "StreetNumAndName", "SecondaryAddress", "FullAddress",
+        "FullSearchable", "OsmSearchable",
+    )
+
+    # One private slot per derived field, holding _UNBUILT until first read
+    __slots__ = (
+        "tagging", "_zip_code", "_state_code", "_full_street_name", "_street_num_and_name", "_secondary_address",
+        "_full_address", "_full_searchable", "_osm_searchable",
+    )
+
+    def __init__(self, tagging: dict[str, str]):
+        # The storage must not be empty, json's encoder writes an empty dict's "{}" without calling items()
+        dict.__init__(self, tagging)
+        self.tagging = tagging
+        self._zip_code = self._state_code = self._full_street_name = self._street_num_and_name = _UNBUILT
+        self._secondary_address = self._full_address = self._full_searchable = self._osm_searchable = _UNBUILT
+
+    @classmethod
+    def bulk(cls, taggings, fields=DERIVED) -> dict[str, list]:
+        """Build only `fields` for a batch of taggings.
+        Args:
+            taggings (Iterable[dict]): Taggings as in `parse_address` results, None for a missing address.
+            fields (Iterable[str], optional): Field names, derived or from the tagging. Defaults to all derived fields.
+        Returns:
+            A list of values per field in input order, None where the address or field is missing.
+        """
+        addresses = [cls(tagging) if tagging else None for tagging in taggings]
+        columns = {}
+        for name in fields:
+            # Derived fields are read through their properties directly, skipping the dict-style lookup
+            if name in cls._DERIVED_NAMES:
+                getter = getattr(cls, name).fget
+                columns[name] = [None if address is None else getter(address) for address in addresses]
+            else:
+                columns[name] = [None if address is None else address.tagging.get(name) for address in addresses]
+        return columns
+
+    @property
+    def ZipCode(self):
+        if (value := self._zip_code) is _UNBUILT:
+            value = self.tagging.get('ZipCode')
+            if value and len(value) == 9:
+                value = f"{value[:5]}-{value[5:]}"
+            self._zip_code = value
+        return value
+
+    @property
+    def StateCode(self):
+        if (value := self._state_code) is _UNBUILT:
+            state = self.tagging.get('StateName') or ''
+            if len(state) > 2:
+                state = AddressNormalization.STATE_FULL_TO_ABV.get(state.title(), '')
+            value = self._state_code = AddressNormalization.STATE_TO_CODE.get(state.upper())
+        return value
+
+    @property
+    def FullStreetName(self):
+        if (value := self._full_street_name) is _UNBUILT:
+            value = self._full_street_name = AddressNormalization.build_street_name(self.tagging)
+        return value
+
+    @property
+    def StreetNumAndName(self):
+        if (value := self._street_num_and_name) is _UNBUILT:
+            value = self._street_num_and_name = f"{self.tagging['AddressNumber'].upper()} {self.FullStreetName}"
+        return value
+
+    @property
+    def SecondaryAddress(self):
+        if (value := self._secondary_address) is _UNBUILT:
+            apartment = AddressNormalization.build_apt(self.tagging)
+            value = self._secondary_address = apartment.strip()[:-1] if apartment else None
+        return value
+
+    def _locality(self):
+        return f"{self.tagging.get('PlaceName').title()}, {self.tagging.get('StateName').upper()} {self.ZipCode or ''}"
+
+    @property
+    def FullAddress(self):
+        # With apartment and punctuation
+        if (value := self._full_address) is _UNBUILT:
+            apartment = f"{secondary}, " if (secondary := self.SecondaryAddress) else ""
+            value = self._full_address = f"{self.StreetNumAndName}, {apartment}{self._locality()}".strip()
+        return value
+
+    @property
+    def FullSearchable(self):
+        # With apartment, without punctuation
+        if (value := self._full_searchable) is _UNBUILT:
+            value = self._full_searchable = AddressNormalization.strip_punctuation(self.FullAddress).strip()
+        return value
+
+    @property
+    def OsmSearchable(self):
+        # What OSM can be searched with
+        if (value := self._osm_searchable) is _UNBUILT:
+            value = self._osm_searchable = f"{self.StreetNumAndName}, {self._locality()}".strip()
+        return value
+
+    def __getitem__(self, name):
+        if name in self._DERIVED_NAMES:
+            if (value := getattr(self, name)) is None:
+                raise KeyError(name)
+            return value
+        return self.tagging[name]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        # Exactly the names __getitem__ returns a value for, building no more than StateCode
+        if name == "SecondaryAddress":
+            return bool(self.tagging.get('OccupancyIdentifier'))
+        if name == "StateCode":
+            return self.StateCode is not None
+        if name == "ZipCode":
+            return 'ZipCode' in self.tagging
+        return name in self._DERIVED_NAMES or name in self.tagging
+
+    _DERIVED_NAMES = frozenset(DERIVED)
+
+    def keys(self):
+        """Tagging keys in order followed by the derived fields, without building any of them."""
+        return [*self.tagging, *(name for name in self.DERIVED if name not in self.tagging and name in self)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __reversed__(self):
+        return reversed(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def values(self):
+        return [self[name] for name in self.keys()]
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def to_dict(self) -> dict[str, str]:
+        """Every field as a plain dict, as the eager `parsed_as_addr` built it."""
+        values = dict(self.tagging)
+        if 'ZipCode' in values:
+            values['ZipCode'] = self.ZipCode
+        for name in self.DERIVED[1:]:
+            if (value := getattr(self, name)) is not None:
+                values[name] = value
+        return values
+
+    def copy(self) -> dict[str, str]:
+        return self.to_dict()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only, to_dict() gives a copy that can be changed")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    # dict's own __ne__ compares the storage alone
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Built fields are dropped; the sentinel would not survive pickling
+        return type(self), (self.tagging,)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.tagging!r})"
+
 
 class AddressNormalization:
 
+    # Removes all punctuation except '-' from addresses and derived strings
+    PUNCTUATION_TABLE = str.maketrans('', '', punctuation.replace('-', ''))
+    PUNCTUATION_BYTES = punctuation.replace('-', '').encode()
+
     STATE_ABV_TO_FULL = {
         "AK": "Alaska", "AL": "Alabama", "AR": "Arkansas", "AZ": "Arizona", "CA": "California", "CO": "Colorado",
         "CT": "Connecticut", "DC": "District of Columbia", "DE": "Delaware", "FL": "Florida", "GA": "Georgia",
@@ -295,9 +587,39 @@ class AddressNormalization:
     }
 
 
+    EXPAND_CACHE_SIZE = 65536
+
+    _STREET_TYPE_INDEXES = {}
+
+    @classmethod
+    def street_type_index(cls, street_names: dict[str, set[str]]) -> StreetTypeIndex:
+        """Return the prebuilt index for a street type mapping, building it on first use.
+        The mapping is treated as read-only once it has been indexed.
+        """
+        cached = cls._STREET_TYPE_INDEXES.get(id(street_names))
+        if cached is None or cached[0] is not street_names:
+            cached = (street_names, StreetTypeIndex(street_names))
+            cls._STREET_TYPE_INDEXES[id(street_names)] = cached
+        return cached[1]
+
     @staticmethod
+    @lru_cache(maxsize=EXPAND_CACHE_SIZE)
+    def _match_street_type(index: StreetTypeIndex, value: str, discriminator: float) -> str:
+        return index.match(value, discriminator)
+
+    @classmethod
+    def expand_street_type_cache_info(cls):
+        """Hit/miss counters of the bounded `expand_street_type` memoization cache."""
+        return cls._match_street_type.cache_info()
+
+    @classmethod
+    def clear_street_type_cache(cls):
+        cls._match_street_type.cache_clear()
+        cls._STREET_TYPE_INDEXES.clear()
+
+    @classmethod
     def expand_street_type(
-        value: str, street_names: dict[str, set[str]], discriminator: float = 97.0
+        cls, value: str, street_names: dict[str, set[str]], discriminator: float = 97.0
     ) -> str:
         """
         Expand a potentially abbreviated or misspelled street type to its full form.
@@ -315,36 +637,54 @@ class AddressNormalization:
         if value in street_names:
             return value
 
-        candidates = [
-            (key, val)
-            for key, val in street_names.items()
-            if process.extractOne(value, val, scorer=fuzz.WRatio)[1]
-            > discriminator
-        ]
-        return max(
-            candidates,
-            key=lambda x: process.extractOne(value, x[1], scorer=fuzz.WRatio)[1],
-            default=(value,),
-        )[0]
+        return cls._match_street_type(cls.street_type_index(street_names), value, discriminator)
+
+    @classmethod
+    def expand_street_types(
+        cls, values, street_names: dict[str, set[str]], discriminator: float = 97.0, workers: int = -1
+    ) -> list[str]:
+        """Expand many street types at once, with the same results as `expand_street_type` per value.
+        Distinct values that are not already keys are scored together with `rapidfuzz.process.cdist`.
+        Args:
+            values (Iterable[str]): The street types to expand.
+            street_names (Dict[str, Set[str]]): A dictionary mapping street type keys to sets of alternative spellings.
+            discriminator (float, optional): The similarity threshold above which a match is considered. Default is 97.0.
+            workers (int, optional): Threads `cdist` scores with, -1 for all CPUs. Defaults to -1.
+        Returns:
+            The expanded street types in input order.
+        """
+        values = [value.lower() for value in values]
+        distinct = list(dict.fromkeys(value for value in values if value not in street_names))
+        if not distinct:
+            return values
+        expanded = dict(zip(distinct, cls.street_type_index(street_names).match_many(distinct, discriminator, workers)))
+        return [expanded.get(value, value) for value in values]
+
+
 
+    # Optional NormalizationCache consulted by parse_address when no cache is passed explicitly
+    cache = None
 
     @classmethod
-    def parse_address(cls, address: str, w_street_expansion: bool = True) -> tuple[dict[str, str], str]:
+    def parse_address(
+        cls, address: str, w_street_expansion: bool = True, cache=None
+    ) -> tuple[dict[str, str], str]:
         """Standardize an address using the usaddress package.
         Args:
             address (str): The address to standardize.
             w_street_expansion (bool, optional): Whether to expand the street type. Defaults to True.
+            cache (NormalizationCache, optional): Cache of earlier results. Defaults to `AddressNormalization.cache`.
         Returns:
             The parsed address and address type.
         """
 
-        punctuation_to_remove = punctuation.replace('-', '')
-        translation_table = str.maketrans('', '', punctuation_to_remove)
-        address = address.translate(translation_table)
-        
-        # Clean the address text
-        address = re.sub(r"[\r\n]+", " ", address)
-        address = re.sub(r"\s+", " ", address).strip().lower()
+        address = cls.clean_address(address)
+
+        cache = cls.cache if cache is None else cache
+        if cache is not None:
+            key = cache.make_key(address, w_street_expansion)
+            if (cached := cache.get(key)) is not None:
+                return cached
 
         default_tagging, address_type = tag(address)
 
@@ -354,9 +694,226 @@ class AddressNormalization:
                     street_name_post_type, cls.US_STREET_NAMES
                 )
 
+        if cache is not None:
+            cache.put(key, default_tagging, address_type)
+
         return default_tagging, address_type
-    
-    
+
+    @staticmethod
+    def strip_punctuation(text: str) -> str:
+        """`text.translate(PUNCTUATION_TABLE)`, several times faster. The punctuation is all ASCII and
+        UTF-8 never uses ASCII bytes inside multi-byte characters, so deleting bytes is safe."""
+        return text.encode().translate(None, AddressNormalization.PUNCTUATION_BYTES).decode()
+
+    @staticmethod
+    def clean_address(address: str) -> str:
+        """Strip punctuation other than '-', collapse whitespace and lower-case an address."""
+        # split() without arguments drops the same whitespace runs, newlines included, as \s+
+        return " ".join(address.translate(AddressNormalization.PUNCTUATION_TABLE).split()).lower()
+
+    @classmethod
+    def parse_addresses(
+        cls, addresses, w_street_expansion: bool = True, cache=None, workers: int = -1, rejects=None
+    ) -> list[tuple[dict[str, str], str]]:
+        """`parse_address` for a batch, expanding the street types of all uncached addresses in one
+        `expand_street_types` call.
+        Args:
+            addresses (Iterable[str]): The addresses to standardize.
+            w_street_expansion (bool, optional): Whether to expand the street type. Defaults to True.
+            cache (NormalizationCache, optional): Cache of earlier results. Defaults to `AddressNormalization.cache`.
+            workers (int, optional): Threads for fuzzy scoring, see `expand_street_types`. Defaults to -1.
+            rejects (RejectSink, optional): Sink for addresses that fail to parse, which then give None
+                instead of raising. Defaults to raising.
+        Returns:
+            The parsed addresses and address types in input order.
+        """
+        cache = cls.cache if cache is None else cache
+        addresses = list(addresses)
+        errors = None if rejects is None else {}
+        results, tagged = cls._tag_addresses(addresses, w_street_expansion, cache, errors)
+        if w_street_expansion:
+            cls._expand_post_types([results[row][0] for row, _ in tagged], workers)
+        cls._cache_results(cache, results, tagged)
+        if rejects is not None:
+            for row, error in errors.items():
+                rejects.reject(RejectSink.record_dict(addresses[row]), *RejectSink.describe(error))
+            rejects.accept(len(results) - len(errors))
+        return results
+
+    @classmethod
+    def parse_entries(cls, entries, structured: bool = True, workers: int = -1, errors=None):
+        """Taggings of entries from their fields like `parse_structured`, tagging the full address
+        only where the fields are ambiguous. The street types of the structured rows and of those
+        that fall back are expanded together in one `expand_street_types` call.
+        Args:
+            entries (list): Entries with `housenumber`, `street` and `create_full_str()`.
+            structured (bool, optional): Use the fields where they are unambiguous. Defaults to True.
+            workers (int, optional): Threads for fuzzy scoring, see `expand_street_types`. Defaults to -1.
+            errors (dict, optional): Collects the error of each failed entry under its position, the
+                entry then gives None. Defaults to raising.
+        Returns:
+            The tagging and address type of each entry and whether it fell back to the tagger, in input order.
+        """
+        parsed, fallback_rows, addresses = [], [], []
+        for row, entry in enumerate(entries):
+            tagging = None
+            try:
+                if structured:
+                    tagging = cls.parse_structured(entry.housenumber, entry.street, w_street_expansion=False)
+                if tagging is None:
+                    addresses.append(entry.create_full_str())
+                    fallback_rows.append(row)
+            except Exception as error:
+                if errors is None:
+                    raise
+                errors[row] = error
+            parsed.append(tagging)
+
+        cache = cls.cache
+        tag_errors = None if errors is None else {}
+        fallbacks, tagged = cls._tag_addresses(addresses, True, cache, tag_errors)
+        for row, fallback in zip(fallback_rows, fallbacks):
+            parsed[row] = fallback
+        if tag_errors:
+            errors.update((fallback_rows[position], error) for position, error in tag_errors.items())
+
+        # Cached fallbacks were stored expanded, only the structured rows and fresh taggings need it
+        fallback_set = set(fallback_rows)
+        expand = [
+            tagging[0] for row, tagging in enumerate(parsed) if tagging is not None and row not in fallback_set
+        ]
+        expand.extend(fallbacks[position][0] for position, _ in tagged)
+        cls._expand_post_types(expand, workers)
+        cls._cache_results(cache, fallbacks, tagged)
+        return [
+            None if tagging is None else (tagging, row in fallback_set) for row, tagging in enumerate(parsed)
+        ]
+
+    @classmethod
+    def _tag_addresses(cls, addresses, w_street_expansion, cache, errors=None):
+        """The tagging phase of `parse_addresses`: take each address from `cache` or tag it, leaving
+        the street types unexpanded. Addresses that fail give None and their error is stored under
+        their position in `errors`, or raised when it is None.
+        Returns:
+            The results in input order and the (position, cache key) of every address tagged here.
+        """
+        results = []
+        tagged = []
+        for address in addresses:
+            try:
+                cleaned = cls.clean_address(address)
+                key = None
+                if cache is not None:
+                    key = cache.make_key(cleaned, w_street_expansion)
+                    if (cached := cache.get(key)) is not None:
+                        results.append(cached)
+                        continue
+                results.append(tag(cleaned))
+            except Exception as error:
+                if errors is None:
+                    raise
+                errors[len(results)] = error
+                results.append(None)
+                continue
+            tagged.append((len(results) - 1, key))
+        return results, tagged
+
+    @classmethod
+    def _expand_post_types(cls, taggings, workers: int = -1):
+        """Expand the StreetNamePostType of every tagging in place with one `expand_street_types` call."""
+        taggings = [tagging for tagging in taggings if tagging.get("StreetNamePostType")]
+        expanded = cls.expand_street_types(
+            [tagging["StreetNamePostType"] for tagging in taggings], cls.US_STREET_NAMES, workers=workers
+        )
+        for tagging, street_name_post_type in zip(taggings, expanded):
+            tagging["StreetNamePostType"] = street_name_post_type
+
+    @staticmethod
+    def _cache_results(cache, results, tagged):
+        if cache is not None:
+            for row, key in tagged:
+                cache.put(key, *results[row])
+
+    @classmethod
+    def parse_many(
+        cls,
+        addresses,
+        w_street_expansion: bool = True,
+        workers: int | None = None,
+        chunksize: int = 256,
+        lazy: bool = False,
+        executor: "ProcessPoolExecutor | None" = None,
+        cache=None,
+        rejects=None,
+    ):
+        """Standardize many addresses over a process pool, keeping input order.
+        Args:
+            addresses (Iterable[str]): The addresses to standardize.
+            w_street_expansion (bool, optional): Whether to expand the street type. Defaults to True.
+            workers (int, optional): Worker processes, defaults to the CPU count. 1 parses in this process.
+            chunksize (int, optional): Addresses sent to a worker per task. Defaults to 256.
+            lazy (bool, optional): Return an iterator instead of a list. Defaults to False.
+            executor (ProcessPoolExecutor, optional): An existing pool to submit to instead of starting one.
+            cache (NormalizationCache, optional): Cache to use; each worker process reopens its file.
+            rejects (RejectSink, optional): Sink for addresses that fail to parse, which then give None
+                instead of raising. Defaults to raising.
+        Returns:
+            The `parse_address` results in input order, as a list or an iterator.
+        """
+        results = cls._iter_parse_many(addresses, w_street_expansion, workers, chunksize, executor, cache, rejects)
+        return results if lazy else list(results)
+
+    @classmethod
+    def _iter_parse_many(cls, addresses, w_street_expansion, workers, chunksize, executor, cache, rejects=None):
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 and executor is None:
+            for address in addresses:
+                try:
+                    result = cls.parse_address(address, w_street_expansion, cache)
+                except Exception as error:
+                    if rejects is None:
+                        raise
+                    rejects.reject(RejectSink.record_dict(address), *RejectSink.describe(error))
+                    result = None
+                else:
+                    if rejects is not None:
+                        rejects.accept()
+                yield result
+            return
+
+        if executor is None:
+            cache_config = None
+            if cache is not None:
+                cache.flush()
+                cache_config = cache.config()
+            # Imported here, multiprocessing is a noticeable share of this module's import time
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(workers, initializer=_init_parse_worker, initargs=(cache_config,)) as pool:
+                yield from cls._iter_parse_many(addresses, w_street_expansion, workers, chunksize, pool, None, rejects)
+            return
+
+        # Keep a bounded number of chunks in flight so lazy callers never buffer the whole input
+        pending = deque()
+        for chunk in _chunked(addresses, chunksize):
+            pending.append(executor.submit(_parse_chunk, chunk, w_street_expansion, rejects is not None))
+            if len(pending) >= workers * 2:
+                yield from cls._chunk_results(pending.popleft(), rejects)
+        while pending:
+            yield from cls._chunk_results(pending.popleft(), rejects)
+
+    @staticmethod
+    def _chunk_results(future, rejects):
+        if rejects is None:
+            return future.result()
+        # Rejections come back from the worker and go to the sink in chunk order
+        results, rejected = future.result()
+        for rejection in rejected:
+            rejects.reject(*rejection)
+        rejects.accept(len(results) - len(rejected))
+        return results
+
+
     @staticmethod
     def parsed_to_str(address):
         addr_str = ""
@@ -366,40 +923,21 @@ class AddressNormalization:
     
     @classmethod
     def parsed_as_addr(cls, addr):
+        """Wrap a `parse_address` result in a `NormalizedAddress`, whose derived fields such as
+        `FullSearchable` are built when first read.
+        Returns:
+            The NormalizedAddress, or None for an empty result.
+        """
         if not addr or not addr[0]:
             return None
-        
-        addr=addr[0]
-
-        zip_code = addr.get('ZipCode')
-        if zip_code and len(zip_code) == 9:
-            addr['ZipCode'] = f"{zip_code[:5]}-{zip_code[5:]}"
-
-        if len(addr.get('StateName')) > 2:
-            state_abbv = cls.STATE_FULL_TO_ABV[addr.get('StateName').title()]
-            addr['StateCode'] = cls.STATE_TO_CODE[state_abbv]
-        else:
-            addr['StateCode'] = cls.STATE_TO_CODE[addr.get('StateName').upper()]
-        addr['FullStreetName'] = (cls.build_street_name(addr))
-        addr['StreetNumAndName'] = f"{addr['AddressNumber'].upper()} {addr['FullStreetName']}"
-        secondary = cls.build_apt(addr)
-        if secondary:
-            secondary = secondary.strip()[:-1]
-            addr['SecondaryAddress'] = secondary
-
-        #full address with apartment and punctuation
-        addr['FullAddress'] = (f"{addr.get('StreetNumAndName')}, {cls.build_apt(addr) if secondary else ''}{addr.get('PlaceName').title()}, {addr.get('StateName').upper()} {addr.get('ZipCode') if addr.get('ZipCode') else ''}").strip()
-
-        #full address with apartment and no punctuation
-        punctuation_to_remove = punctuation.replace('-', '')
-        translation_table = str.maketrans('', '', punctuation_to_remove)
-        addr['FullSearchable'] = addr['FullAddress'].translate(translation_table).strip()
-
-        #can search OSM with this one
-        addr['OsmSearchable'] = (f"{addr.get('StreetNumAndName')}, {addr.get('PlaceName').title()}, {addr.get('StateName').upper()} {addr.get('ZipCode') if addr.get('ZipCode') else ''}").strip()
-        
-        return addr
-    
+        return NormalizedAddress(addr[0])
+
+    @classmethod
+    def parsed_as_addrs(cls, parsed, fields=NormalizedAddress.DERIVED) -> dict[str, list]:
+        """`parsed_as_addr` for a batch of `parse_address` results, building only `fields`.
+        See `NormalizedAddress.bulk`."""
+        return NormalizedAddress.bulk((addr[0] if addr else None for addr in parsed), fields)
+
     @staticmethod
     def build_apt(addr):
         if not addr.get('OccupancyIdentifier'):
@@ -410,12 +948,14 @@ class AddressNormalization:
 
     @staticmethod
     def build_street_name(addr):
+        get = addr.get
+        street_name = get('StreetName')
         parts = [
-            addr.get('StreetNamePreDirectional', '').upper() if addr.get('StreetNamePreDirectional') else None,
-            addr.get('StreetNamePreType').title() if addr.get('StreetNamePreType') else None,
-            addr.get('StreetName').title() if addr.get('StreetName') and not addr.get('StreetName')[0].isdigit() else addr.get('StreetName'),            
-            addr.get('StreetNamePostType').title() if addr.get('StreetNamePostType') else None,
-            addr.get('StreetNamePostDirectional', '').upper() if addr.get('StreetNamePostDirectional') else None
+            (pre_directional := get('StreetNamePreDirectional')) and pre_directional.upper(),
+            (pre_type := get('StreetNamePreType')) and pre_type.title(),
+            street_name.title() if street_name and not street_name[0].isdigit() else street_name,
+            (post_type := get('StreetNamePostType')) and post_type.title(),
+            (post_directional := get('StreetNamePostDirectional')) and post_directional.upper(),
         ]
         # Filter out None values and join the parts with a space
         return ' '.join(filter(None, parts)).strip()
@@ -425,7 +965,89 @@ class AddressNormalization:
         model.housenumber = addr[0]['AddressNumber']
         model.street = f"{addr[0]['StreetName'].capitalize()} {addr[0]['StreetNamePostType'].capitalize() if 'StreetNamePostType' in addr[0].keys() else ''}"
         return model
+
+    # Words the CRF tagger reads as something other than part of the street name or suffix
+    STRUCTURED_AMBIGUOUS_WORDS = {
+        "n", "s", "e", "w", "ne", "nw", "se", "sw", "north", "south", "east", "west",
+        "northeast", "northwest", "southeast", "southwest",
+        "apt", "apartment", "unit", "ste", "suite", "bldg", "building", "fl", "floor", "rm", "room",
+        "lot", "dept", "spc", "space", "po", "box", "pmb",
+        "highway", "hwy", "route", "rte", "county", "state", "interstate", "us", "ih", "sr", "cr", "fm", "rr",
+        "camino", "calle", "avenida",
+    }
+    STRUCTURED_HOUSENUMBER = re.compile(r"^(?:[a-z]?\d+[a-z]?|\d+-\d+)$")
+    STRUCTURED_NAME_WORD = re.compile(r"^(?:[a-z]+|\d+(?:st|nd|rd|th))$")
+
+    @classmethod
+    def parse_structured(
+        cls, housenumber, street, full_address: str | None = None, w_street_expansion: bool = True
+    ):
+        """Build the `parse_address` tagging for AddressNumber, StreetName and StreetNamePostType
+        directly from already separated fields, without running the CRF tagger.
+        Args:
+            housenumber (str | int): The house number field.
+            street (str): The street field, name followed by its suffix.
+            full_address (str, optional): Address parsed with `parse_address` when the fields are ambiguous.
+            w_street_expansion (bool, optional): Whether to expand the street type. Defaults to True.
+        Returns:
+            The tagging and address type like `parse_address`, or None if the fields are ambiguous
+            and no `full_address` was given.
+        """
+        number = str(housenumber).translate(cls.PUNCTUATION_TABLE).strip().lower()
+        words = str(street).translate(cls.PUNCTUATION_TABLE).lower().split()
+
+        index = cls.street_type_index(cls.US_STREET_NAMES)
+        if (
+            cls.STRUCTURED_HOUSENUMBER.match(number)
+            and len(words) >= 2
+            and (words[-1] in index.aliases or words[-1] in cls.US_STREET_NAMES)
+            # A second suffix before the last word may be read as the suffix, with the last as a modifier
+            and (len(words) == 2 or words[-2] not in index.aliases)
+            # Expanded too, so every spelling of an ambiguous suffix like "hiway" falls back alike
+            and not any(
+                word in cls.STRUCTURED_AMBIGUOUS_WORDS or index.aliases.get(word) in cls.STRUCTURED_AMBIGUOUS_WORDS
+                for word in words
+            )
+            and all(cls.STRUCTURED_NAME_WORD.match(word) for word in words[:-1])
+        ):
+            street_name_post_type = words[-1]
+            if w_street_expansion:
+                street_name_post_type = cls.expand_street_type(street_name_post_type, cls.US_STREET_NAMES)
+            return {
+                "AddressNumber": number,
+                "StreetName": " ".join(words[:-1]),
+                "StreetNamePostType": street_name_post_type,
+            }, "Street Address"
+
+        if full_address is None:
+            return None
+        return cls.parse_address(full_address, w_street_expansion)
     
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _init_parse_worker(cache_config=None):
+    # usaddress loads its CRF model once per process on import; tag once so it is warm
+    tag("1 main st")
+    if cache_config is not None:
+        from multiprocessing.util import Finalize
+        from .normalization_cache import NormalizationCache
+
+        AddressNormalization.cache = NormalizationCache(**cache_config)
+        Finalize(AddressNormalization.cache, AddressNormalization.cache.close, exitpriority=10)
+
+
+def _parse_chunk(addresses, w_street_expansion, collect_rejects=False):
+    # Each worker process is one of several already; score its chunk's street types on one thread
+    if not collect_rejects:
+        return AddressNormalization.parse_addresses(addresses, w_street_expansion, workers=1)
+    rejected = RejectList()
+    return AddressNormalization.parse_addresses(addresses, w_street_expansion, workers=1, rejects=rejected), rejected
+
+
 """ Usage
 address = "123 Test St, Testville, TX 12345, USA"
 parsed_address = AddressNormalization.parse_address(address)
@@ -0,0 +1,215 @@
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from importlib.metadata import PackageNotFoundError, version
+
+from .normalization import AddressNormalization
+
+
+class NormalizationCache:
+    """Two-level cache of `parse_address` results keyed by the cleaned, lower-cased address.
+
+    An in-memory LRU sits in front of an optional SQLite file. The file is wiped whenever
+    the street type tables or the usaddress version no longer match the ones it was built with,
+    and the least recently used rows are evicted once it holds more than `max_entries`.
+    One cache may be shared by threads, such as those of `create_new_entry`'s thread executor;
+    a lock serializes access to the LRU, the write buffer and the connection.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_entries: int = 5_000_000,
+        memory_entries: int = 100_000,
+        commit_every: int = 1000,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.commit_every = commit_every
+        self.fingerprint = self.table_fingerprint()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._pending = {}
+        self._db = None
+        # Reentrant, since put() flushes while holding it
+        self._lock = threading.RLock()
+        if path is not None:
+            self._open()
+
+    @staticmethod
+    def table_fingerprint() -> str:
+        """Hash of everything a cached result depends on besides the address itself."""
+        try:
+            usaddress_version = version("usaddress")
+        except PackageNotFoundError:
+            usaddress_version = "unknown"
+        tables = sorted((key, sorted(aliases)) for key, aliases in AddressNormalization.US_STREET_NAMES.items())
+        payload = json.dumps([NormalizationCache.SCHEMA_VERSION, usaddress_version, tables])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def config(self) -> dict:
+        """Constructor arguments, used to reopen the same cache in worker processes."""
+        return {
+            "path": self.path,
+            "max_entries": self.max_entries,
+            "memory_entries": self.memory_entries,
+            "commit_every": self.commit_every,
+        }
+
+    def _open(self):
+        # Used from whichever thread holds the lock, not only the one that opened it
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, used INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+        stored = self._db.execute("SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+        if stored is None or stored[0] != self.fingerprint:
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (self.fingerprint,))
+        self._db.commit()
+        self._clock = self._db.execute("SELECT COALESCE(MAX(used), 0) FROM entries").fetchone()[0]
+        self._size = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def make_key(address: str, w_street_expansion: bool) -> str:
+        return f"{int(w_street_expansion)}|{address}"
+
+    def get(self, key: str) -> tuple[dict[str, str], str] | None:
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            self.memory_hits += 1
+            return dict(value[0]), value[1]
+
+        if self._db is not None:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None and key in self._pending:
+                row = (self._pending[key],)
+            if row is not None:
+                tagging, address_type = json.loads(row[0])
+                value = (tuple(map(tuple, tagging)), address_type)
+                self._remember(key, value)
+                self._touch(key, None)
+                self.hits += 1
+                return dict(value[0]), value[1]
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, tagging: dict[str, str], address_type: str):
+        value = (tuple(tagging.items()), address_type)
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._touch(key, json.dumps(value))
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key, value):
+        # Writes are buffered and applied in one short transaction so that several
+        # processes sharing the file never hold the write lock for long
+        if value is None:
+            value = self._pending.get(key)
+        self._pending[key] = value
+        if len(self._pending) >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        """Write buffered inserts and recency updates to the SQLite file."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._db is None or not self._pending:
+            return
+        inserts, updates = [], []
+        for key, value in self._pending.items():
+            self._clock += 1
+            if value is None:
+                updates.append((self._clock, key))
+            else:
+                inserts.append((key, value, self._clock))
+        self._pending.clear()
+        with self._db:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO entries VALUES (?, ?, ?)", inserts)
+            self._size += self._db.total_changes - before
+            self._db.executemany("UPDATE entries SET used = ? WHERE key = ?", updates)
+            if self._size > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        # Other processes may have written to the file too, so recount before evicting
+        self._size = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if self._size <= self.max_entries:
+            return
+        # Drop 10% below the limit at once so eviction does not run on every flush
+        excess = self._size - int(self.max_entries * 0.9)
+        self._db.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used LIMIT ?)", (excess,)
+        )
+        self._size -= excess
+        self.evictions += excess
+
+    def stats(self) -> dict:
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.hits - self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._size if self._db is not None else 0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._pending.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+                self._size = 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._flush()
+                self._db.close()
+                self._db = None
+
+    def __len__(self):
+        return self._size if self._db is not None else len(self._memory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,130 @@
+import os
+
+from .lazy import osmium
+
+
+class ShardedOsmWriter:
+    """osmium.SimpleWriter that picks the output format and rolls over into numbered shards.
+
+    Without a shard limit everything goes to `filename` as before. With `shard_nodes` or
+    `shard_bytes` set, output goes to `<stem>-00001<suffix>`, `<stem>-00002<suffix>`, ... and a
+    new shard is started by `check_rollover` once the current one reaches either limit.
+
+    libosmium encodes and writes on its own threads, and PBF and compressed output often reach
+    the disk only when the file is closed, so the size on disk says little about an open shard.
+    Instead each node's size in XML is counted as it is added, scaled by the ratio of actual to
+    counted bytes of the last closed shard (`bytes_ratio`). XML shards then stay within one entry
+    of `shard_bytes`. Compressed formats start at a ratio of 1, which makes their first shard
+    smaller than the limit, and later shards overshoot only as far as their compression ratio
+    differs from the previous shard's. `completed_files` and `bytes_ratio` continue a sharded
+    run after shards that were already written; with `resume`, shards numbered after them are
+    taken as left over from the interrupted run and removed, even if no shard was completed.
+    """
+
+    # name: (file suffix, libosmium format string)
+    OUTPUT_FORMATS = {
+        "xml": (".osm.xml", "xml"),
+        "pbf": (".osm.pbf", "pbf"),
+        "gz": (".osm.gz", "osm.gz"),
+        "bz2": (".osm.bz2", "osm.bz2"),
+    }
+
+    # Bytes of a node in libosmium's XML output besides its ID, user name and tags (coordinates
+    # counted at their widest), and of a tag besides its key and value
+    XML_NODE_BYTES = 115
+    XML_TAG_BYTES = 21
+
+    def __init__(
+        self, filename, output_format=None, shard_nodes=None, shard_bytes=None, buffer_size=4 * 1024 * 1024,
+        completed_files=(), bytes_ratio=1.0, resume=False,
+    ):
+        if output_format is not None and output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {output_format!r}, expected one of {list(self.OUTPUT_FORMATS)}")
+        self.filename = filename
+        self.output_format = output_format
+        self.shard_nodes = shard_nodes
+        self.shard_bytes = shard_bytes
+        self.buffer_size = buffer_size
+        self.files = list(completed_files)
+        self.bytes_ratio = bytes_ratio
+        self.nodes = 0
+        self.shard_node_count = 0
+        self.shard_counted_bytes = 0
+        self._writer = None
+        # Shards after the completed ones are left over from an interrupted run; write them again
+        index = len(self.files) + 1
+        while self.sharded and (resume or self.files) and os.path.exists(leftover := self.shard_filename(index)):
+            os.remove(leftover)
+            index += 1
+        self._open()
+
+    @classmethod
+    def default_filename(cls, stem, output_format=None):
+        return f"{stem}{cls.OUTPUT_FORMATS[output_format or 'xml'][0]}"
+
+    @property
+    def sharded(self):
+        return bool(self.shard_nodes or self.shard_bytes)
+
+    def shard_filename(self, index):
+        if not self.sharded:
+            return self.filename
+        directory, name = os.path.split(self.filename)
+        if ".osm" in name:
+            split_at = name.index(".osm")
+            stem, suffix = name[:split_at], name[split_at:]
+        else:
+            stem, suffix = os.path.splitext(name)
+        return os.path.join(directory, f"{stem}-{index:05d}{suffix}")
+
+    def _open(self):
+        path = self.shard_filename(len(self.files) + 1)
+        target = path
+        if self.output_format is not None:
+            target = osmium.io.File(path, self.OUTPUT_FORMATS[self.output_format][1])
+        self._writer = osmium.SimpleWriter(target, self.buffer_size)
+        self.files.append(path)
+        self.shard_node_count = 0
+        self.shard_counted_bytes = 0
+
+    def check_rollover(self):
+        """Start the next shard if the current one is full. Call between entries so that
+        nodes belonging together end up in the same shard."""
+        if not self.sharded or self.shard_node_count == 0:
+            return False
+        full = self.shard_nodes is not None and self.shard_node_count >= self.shard_nodes
+        if not full and self.shard_bytes is not None:
+            full = self.shard_counted_bytes * self.bytes_ratio >= self.shard_bytes
+        if full:
+            self._writer.close()
+            if self.shard_bytes is not None:
+                # The closed file is complete on disk, so its size is exact
+                self.bytes_ratio = os.path.getsize(self.files[-1]) / self.shard_counted_bytes
+            self._open()
+        return full
+
+    @classmethod
+    def xml_bytes(cls, node):
+        """Size of a node in libosmium's XML output, short only by the escaping of special characters."""
+        size = cls.XML_NODE_BYTES + len(str(node.id)) + len(node.user)
+        for key, value in node.tags:
+            size += cls.XML_TAG_BYTES + len(key) + len(value)
+        return size
+
+    def add_node(self, node):
+        self._writer.add_node(node)
+        self.nodes += 1
+        self.shard_node_count += 1
+        if self.shard_bytes is not None:
+            self.shard_counted_bytes += self.xml_bytes(node)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
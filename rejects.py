@@ -0,0 +1,104 @@
+import json
+import math
+import threading
+
+from collections import Counter
+
+
+class RejectSink:
+    """JSON Lines file of records that failed a pipeline stage.
+
+    Each line holds the record, the stage that failed, the error type and its message. The sink
+    also counts accepted and rejected records per run. Writes are serialized with a lock, so one
+    sink can be shared between threads.
+    """
+
+    def __init__(self, path, mode="w"):
+        self.path = path
+        self.accepted = 0
+        self.rejected = 0
+        self.stages = Counter()
+        self._file = open(path, mode, encoding="utf-8")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stage_of(error):
+        """Name of the innermost function of this package the error passed through, e.g.
+        `parsed_street_to_model` for a missing StreetName or `tag` for a usaddress tagging error."""
+        stage = None
+        traceback = error.__traceback__
+        while traceback is not None:
+            frame = traceback.tb_frame
+            if frame.f_globals.get("__package__") == __package__:
+                stage = frame.f_code.co_name
+            traceback = traceback.tb_next
+        return stage or "unknown"
+
+    @classmethod
+    def describe(cls, error, stage=None):
+        """(stage, error type, message) of an exception, in a form that pickles across processes."""
+        return stage or cls.stage_of(error), type(error).__name__, str(error)
+
+    @staticmethod
+    def record_dict(record):
+        """Plain dict of an entry, batch row, feed row dict or address string, with NaN coordinates as None."""
+        if isinstance(record, str):
+            return {"address": record}
+        if isinstance(record, dict):
+            values = record
+        elif hasattr(record, "model_dump"):
+            values = record.model_dump()
+        elif hasattr(record, "__slots__"):
+            values = {name: getattr(record, name, None) for name in record.__slots__}
+        else:
+            values = dict(vars(record))
+        return {
+            name: None if isinstance(value, float) and math.isnan(value) else value
+            for name, value in values.items()
+        }
+
+    def reject(self, record, stage, error_type, message):
+        line = json.dumps({"record": record, "stage": stage, "error": error_type, "message": message}, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self.rejected += 1
+            self.stages[stage] += 1
+
+    def accept(self, count=1):
+        with self._lock:
+            self.accepted += count
+
+    def skip(self, stage, count=1):
+        """Count rejections at `stage` that an interrupted run already wrote, without writing them again."""
+        with self._lock:
+            self.rejected += count
+            self.stages[stage] += count
+
+    def totals(self):
+        return {"accepted": self.accepted, "rejected": self.rejected, "stages": dict(self.stages)}
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RejectList(list):
+    """In-memory stand-in for `RejectSink` keeping the `reject` arguments, e.g. to hand them back
+    from a worker process to the sink in the parent."""
+
+    def reject(self, record, stage, error_type, message):
+        self.append((record, stage, error_type, message))
+
+    def accept(self, count=1):
+        # The parent counts the accepted records of a chunk from its results
+        pass
@@ -0,0 +1,13 @@
+import sys
+import types
+from pathlib import Path
+
+# The repository root is the package itself (flat modules with relative imports), and its
+# directory name is not importable; register it under a fixed name for the tests
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "nominatim_entries"
+
+if PACKAGE not in sys.modules:
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [str(ROOT)]
+    sys.modules[PACKAGE] = package
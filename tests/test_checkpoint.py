@@ -0,0 +1,70 @@
+import asyncio
+import os
+import re
+
+import pytest
+
+from nominatim_entries.benchmark import SyntheticAddresses
+from nominatim_entries.checkpoint import ImportCheckpoint
+from nominatim_entries.id_allocator import SequentialIdAllocator
+from nominatim_entries.new_entries import NewEntryXMLActions
+from nominatim_entries.new_entry_model import NewNominatimEntryBatch
+from nominatim_entries.osm_writer import ShardedOsmWriter
+
+OPTIONS = {"batch_size": 100, "shard_nodes": 500}
+
+
+@pytest.fixture(scope="module")
+def records():
+    return SyntheticAddresses(3).records(1000)
+
+
+def run(records, path, **options):
+    return asyncio.run(NewEntryXMLActions.create_new_entry(
+        NewNominatimEntryBatch.from_records(records), str(path / "out.osm.xml"),
+        id_allocator=SequentialIdAllocator(1), checkpoint=str(path / "checkpoint.json"),
+        rejects=str(path / "rejects.jsonl"), **OPTIONS, **options,
+    ))
+
+
+def contents(result):
+    # Each run stamps its nodes with its start time; a resumed run reuses that of the interrupted one
+    return [re.sub(r'timestamp="[^"]*"', "", open(path).read()) for path in result["files"]]
+
+
+@pytest.mark.parametrize("deduplicate", [None, "first"])
+@pytest.mark.parametrize("crash_after", [
+    pytest.param(150, id="first shard"),
+    pytest.param(1250, id="third shard"),
+])
+def test_resumed_run_matches_uninterrupted_run(records, tmp_path, monkeypatch, crash_after, deduplicate):
+    options = {}
+    if deduplicate is not None:
+        # Copies after the crash of rows written before it
+        records = records[:800] + records[100:300]
+        options["deduplicate"] = deduplicate
+    (tmp_path / "expected").mkdir()
+    (tmp_path / "resumed").mkdir()
+    expected = run(records, tmp_path / "expected", **options)
+
+    add_node = ShardedOsmWriter.add_node
+
+    def crashing_add_node(writer, node):
+        if writer.nodes == crash_after:
+            raise RuntimeError("crash")
+        add_node(writer, node)
+
+    monkeypatch.setattr(ShardedOsmWriter, "add_node", crashing_add_node)
+    with pytest.raises(RuntimeError, match="crash"):
+        run(records, tmp_path / "resumed", **options)
+    checkpoint = ImportCheckpoint.open(str(tmp_path / "resumed" / "checkpoint.json"))
+    assert len(checkpoint.files) == (crash_after - 1) // OPTIONS["shard_nodes"]
+
+    monkeypatch.setattr(ShardedOsmWriter, "add_node", add_node)
+    resumed = run(records, tmp_path / "resumed", **options)
+
+    assert len(expected["files"]) == 4
+    assert [os.path.basename(path) for path in resumed["files"]] == [os.path.basename(path) for path in expected["files"]]
+    assert contents(resumed) == contents(expected)
+    for key in ("records", "nodes", "id_range", "invalid_locations", "duplicates", "structured_fallbacks"):
+        assert resumed[key] == expected[key]
@@ -0,0 +1,82 @@
+import asyncio
+import math
+
+import pytest
+
+from nominatim_entries.deduplication import DuplicateDetector
+from nominatim_entries.id_allocator import SequentialIdAllocator
+from nominatim_entries.new_entries import NewEntryXMLActions
+from nominatim_entries.new_entry_model import NewNominatimEntryBatch
+
+
+def record(housenumber, street, lat, lon):
+    return {
+        "housenumber": housenumber, "street": street, "postcode": "78701", "city": "Austin", "state": "TX",
+        "lat": lat, "lon": lon,
+    }
+
+
+@pytest.fixture
+def batch():
+    return NewNominatimEntryBatch.from_records([
+        record("100", "Main Street", 30.2672, -97.7431),
+        record("100", "Main St", 30.26721, -97.74311),
+        record("200", "Oak Avenue", math.nan, -97.7431),
+        record("300", "Elm Street", 30.2690, -97.7450),
+    ])
+
+
+def streets(normalized):
+    return [dict(tags)["addr:street"] for tags, _ in normalized.entries]
+
+
+def test_removes_duplicates(batch):
+    normalized = NewEntryXMLActions.normalize_batch(batch, deduplicate=DuplicateDetector("first"))
+    assert streets(normalized) == ["Main Street", "Elm Street"]
+    assert normalized.duplicates == {"exact": 1, "near": 0, "removed": 1}
+
+
+def test_keep_writes_invalid_rows_in_input_order(batch):
+    normalized = NewEntryXMLActions.normalize_batch(
+        batch, on_invalid_location="keep", deduplicate=DuplicateDetector("first"), collect_rejects=True
+    )
+    assert streets(normalized) == ["Main Street", "Oak Avenue", "Elm Street"]
+    assert normalized.entries[1][1] == (0, 0)
+    assert normalized.rejected == []
+
+
+def test_skip_reports_invalid_rows_as_rejected(batch):
+    normalized = NewEntryXMLActions.normalize_batch(
+        batch, deduplicate=DuplicateDetector("first"), collect_rejects=True
+    )
+    assert streets(normalized) == ["Main Street", "Elm Street"]
+    assert [stage for _, stage, _, _ in normalized.rejected] == ["check_coordinates"]
+
+
+def test_different_addresses_close_by_are_kept():
+    batch = NewNominatimEntryBatch.from_records([
+        record("12", "Oak Street", 30.26720, -97.74310),
+        record("12", "Oak Avenue", 30.26721, -97.74311),
+        record("12", "N Oak Court", 30.26722, -97.74312),
+        record("12", "S Oak Court", 30.26723, -97.74313),
+        dict(record("12", "Oak Street", 30.26724, -97.74314), postcode="99999", city="Other"),
+        record("12", "Oak St", 30.26725, -97.74315),
+    ])
+    normalized = NewEntryXMLActions.normalize_batch(batch, deduplicate=DuplicateDetector("first"))
+    # The street tag leaves the directional out, the two courts are both written
+    assert streets(normalized) == ["Oak Street", "Oak Avenue", "Oak Court", "Oak Court", "Oak Street"]
+    assert normalized.duplicates == {"exact": 1, "near": 0, "removed": 1}
+
+
+@pytest.mark.parametrize("policy", ["first", "merge"])
+def test_finds_duplicates_across_batches(tmp_path, policy):
+    records = [record(str(number), "Main Street", 30.2672 + number * 0.001, -97.7431) for number in range(1, 601)]
+    records[500] = records[10]
+    # Another city spelling makes the exact key differ; the near key has the postcode instead
+    records[550] = dict(records[20], city="Austin City", lat=records[20]["lat"] + 0.00005)
+    result = asyncio.run(NewEntryXMLActions.create_new_entry(
+        NewNominatimEntryBatch.from_records(records), str(tmp_path / "out.osm.xml"), batch_size=64,
+        id_allocator=SequentialIdAllocator(1), deduplicate=policy,
+    ))
+    assert result["records"] == 598
+    assert result["duplicates"] == {"exact": 1, "near": 1, "removed": 2}
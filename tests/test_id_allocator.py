@@ -0,0 +1,24 @@
+import pytest
+
+from nominatim_entries.id_allocator import FileLockIdAllocator, NodeIdAllocator, SequentialIdAllocator
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        NodeIdAllocator()
+
+
+def test_sequential_blocks_do_not_overlap():
+    allocator = SequentialIdAllocator(-1, step=-1, stop=-10)
+    assert list(allocator.reserve(3)) == [-1, -2, -3]
+    assert allocator.next_id() == -4
+    with pytest.raises(ValueError):
+        allocator.reserve(6)
+
+
+def test_file_lock_allocators_share_the_counter(tmp_path):
+    path = str(tmp_path / "ids")
+    first = FileLockIdAllocator(path, start=100)
+    second = FileLockIdAllocator(path)
+    assert list(first.reserve(2)) == [100, 101]
+    assert list(second.reserve(2)) == [102, 103]
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import pytest
+
+from pydantic import ValidationError
+
+from nominatim_entries.id_allocator import SequentialIdAllocator
+from nominatim_entries.ingest import FeedIngest
+
+FEED = """housenumber,street,postcode,city,state,lat,lon
+100,Main Street,78701,Austin,TX,30.2672,-97.7431
+200,,78701,Austin,TX,30.2680,-97.7440
+300,Oak Avenue,78701,Austin,TX,,-97.7450
+400,Elm Street,78701,Austin,TX,north,-97.7460
+500,Pine Road,78701,Austin,TX,30.2700,-97.7470
+"""
+
+
+@pytest.fixture
+def feed(tmp_path):
+    path = tmp_path / "feed.csv"
+    path.write_text(FEED)
+    return str(path)
+
+
+def ingest(feed, tmp_path, **options):
+    return asyncio.run(FeedIngest.ingest(
+        feed, str(tmp_path / "out.osm.xml"), progress=False, id_allocator=SequentialIdAllocator(1), **options
+    ))
+
+
+def test_invalid_rows_go_to_the_sink(feed, tmp_path):
+    result = ingest(feed, tmp_path, rejects=str(tmp_path / "rejects.jsonl"))
+
+    assert result["records"] == 2
+    assert result["rejects"]["accepted"] == 2
+    assert result["rejects"]["rejected"] == 3
+    assert result["rejects"]["stages"] == {"validate": 2, "check_coordinates": 1}
+    with open(tmp_path / "rejects.jsonl") as rejects:
+        lines = [json.loads(line) for line in rejects]
+    assert [(line["record"]["housenumber"], line["stage"]) for line in lines] == [
+        ("200", "validate"), ("400", "validate"), ("300", "check_coordinates"),
+    ]
+    assert lines[0]["message"] == "street: Field required"
+    assert lines[2]["message"] == "missing"
+
+
+def test_invalid_rows_abort_without_a_sink(feed, tmp_path):
+    with pytest.raises(ValidationError):
+        ingest(feed, tmp_path)
@@ -0,0 +1,115 @@
+import json
+import pickle
+
+from collections.abc import Mapping
+
+import pytest
+
+from rapidfuzz import fuzz, process
+
+from nominatim_entries.benchmark import SyntheticAddresses
+from nominatim_entries.coordinates import CoordinateValidation
+from nominatim_entries.new_entries import NewEntryXMLActions
+from nominatim_entries.new_entry_model import NewNominatimEntryBatch
+from nominatim_entries.normalization import AddressNormalization
+
+STREET_NAMES = AddressNormalization.US_STREET_NAMES
+
+# Street types as they come in: keys, aliases, misspellings, other case and words that match nothing
+STREET_TYPES = sorted(
+    set(STREET_NAMES)
+    | {alias for aliases in STREET_NAMES.values() for alias in aliases}
+    | {"Street", "AVE", "stret", "avenu", "boulevrd", "lanee", "crt", "pkwy", "hwy", "xyz", "main", "q", "st."}
+)
+
+
+def reference_expand_street_type(value, street_names, discriminator=97.0):
+    """`expand_street_type` as it was before the StreetTypeIndex."""
+    value = value.lower()
+    if value in street_names:
+        return value
+    candidates = [
+        (key, val) for key, val in street_names.items()
+        if process.extractOne(value, val, scorer=fuzz.WRatio)[1] > discriminator
+    ]
+    return max(
+        candidates, key=lambda x: process.extractOne(value, x[1], scorer=fuzz.WRatio)[1], default=(value,)
+    )[0]
+
+
+@pytest.mark.parametrize("discriminator", [0, 60, 85, 97])
+def test_expand_street_type_matches_reference(discriminator):
+    AddressNormalization.clear_street_type_cache()
+    for value in STREET_TYPES:
+        expected = reference_expand_street_type(value, STREET_NAMES, discriminator)
+        assert AddressNormalization.expand_street_type(value, STREET_NAMES, discriminator) == expected, value
+
+
+@pytest.mark.parametrize("discriminator", [0, 60, 85, 97])
+def test_expand_street_types_matches_reference(discriminator):
+    expected = [reference_expand_street_type(value, STREET_NAMES, discriminator) for value in STREET_TYPES]
+    assert AddressNormalization.expand_street_types(STREET_TYPES, STREET_NAMES, discriminator) == expected
+
+
+@pytest.fixture(scope="module")
+def records():
+    return SyntheticAddresses(1).records(500)
+
+
+@pytest.mark.parametrize("structured", [True, False])
+def test_normalize_batch_matches_parse_entry(records, structured):
+    batch = NewNominatimEntryBatch.from_records(records)
+    normalized = NewEntryXMLActions.normalize_batch(batch, structured=structured, collect_rejects=True)
+
+    expected, rejected, fallbacks = [], 0, 0
+    for entry, location in zip(NewNominatimEntryBatch.from_records(records), batch_locations(batch)):
+        if location is None:
+            continue
+        try:
+            tags, _, fallback = NewEntryXMLActions.parse_entry(entry, structured)
+        except Exception:
+            rejected += 1
+            continue
+        expected.append([tuple(tag) for tag in tags])
+        fallbacks += fallback
+
+    assert [[tuple(tag) for tag in tags] for tags, _ in normalized.entries] == expected
+    assert normalized.structured_fallbacks == fallbacks
+    assert fallbacks and rejected
+    assert sum(stage != "check_coordinates" for _, stage, _, _ in normalized.rejected) == rejected
+
+
+def batch_locations(batch):
+    check = CoordinateValidation.check(batch.lat, batch.lon)
+    return [location if ok else None for location, ok in zip(check.locations(), check.valid.tolist())]
+
+
+@pytest.fixture
+def address():
+    return AddressNormalization.parsed_as_addr(AddressNormalization.parse_address("12 Oak St Apt 4, Austin, TX 787011234"))
+
+
+def test_normalized_address_is_a_dict(address):
+    plain = address.to_dict()
+    assert isinstance(address, dict) and isinstance(address, Mapping)
+    assert json.loads(json.dumps(address)) == plain
+    assert {**address} == dict(address) == plain
+    assert plain["ZipCode"] == "78701-1234" and plain["SecondaryAddress"] == "Apt 4"
+    assert address == plain and not address != plain
+    assert pickle.loads(pickle.dumps(address)) == address
+    with pytest.raises(TypeError):
+        address["StreetName"] = "elm"
+
+
+def test_unknown_state_is_missing():
+    address = AddressNormalization.parsed_as_addr(({"AddressNumber": "1", "StreetName": "main", "StateName": "zz"}, ""))
+    assert "StateCode" not in address
+    assert address.get("StateCode") is None and address.StateCode is None
+    with pytest.raises(KeyError):
+        address["StateCode"]
+    assert "StateCode" not in address.keys()
+
+
+@pytest.mark.parametrize("street", ["3rd Highway", "3rd Hwy", "3rd Hiway", "3rd Hway", "Oak Highwy", "Elm Rte"])
+def test_ambiguous_suffixes_fall_back_whatever_the_spelling(street):
+    assert AddressNormalization.parse_structured("100", street) is None
@@ -0,0 +1,69 @@
+import threading
+
+from nominatim_entries.normalization import AddressNormalization
+from nominatim_entries.normalization_cache import NormalizationCache
+
+
+def test_disk_hits_survive_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with NormalizationCache(path) as cache:
+        cache.put("1|1 main st", {"AddressNumber": "1", "StreetName": "main"}, "Street Address")
+
+    with NormalizationCache(path) as cache:
+        assert cache.get("1|1 main st") == ({"AddressNumber": "1", "StreetName": "main"}, "Street Address")
+        assert cache.stats()["disk_hits"] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with NormalizationCache(path, max_entries=10, memory_entries=1, commit_every=1) as cache:
+        for number in range(10):
+            cache.put(f"1|{number}", {"AddressNumber": str(number)}, "Street Address")
+        # Reading entry 0 makes it the most recently used one
+        assert cache.get("1|0") is not None
+        cache.put("1|10", {"AddressNumber": "10"}, "Street Address")
+        cache.flush()
+
+        assert cache.evictions == 2
+        assert len(cache) == 9
+        cache._memory.clear()
+        assert cache.get("1|0") is not None
+        assert cache.get("1|1") is None
+        assert cache.get("1|2") is None
+        assert cache.get("1|3") is not None
+
+
+def test_fingerprint_change_invalidates_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite")
+    with NormalizationCache(path) as cache:
+        cache.put("1|1 main st", {"AddressNumber": "1"}, "Street Address")
+
+    street_names = dict(AddressNormalization.US_STREET_NAMES, lane={"ln", "lane", "lne"})
+    monkeypatch.setattr(AddressNormalization, "US_STREET_NAMES", street_names)
+    with NormalizationCache(path) as cache:
+        assert len(cache) == 0
+        assert cache.get("1|1 main st") is None
+
+
+def test_shared_between_threads(tmp_path):
+    with NormalizationCache(str(tmp_path / "cache.sqlite"), commit_every=7) as cache:
+        errors = []
+
+        def work(thread):
+            try:
+                for number in range(200):
+                    cache.put(f"1|{thread}-{number}", {"AddressNumber": str(number)}, "Street Address")
+                    assert cache.get(f"1|{thread}-{number}") is not None
+                cache.flush()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=work, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        cache.flush()
+        assert len(cache) == 800
@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+import pytest
+
+from nominatim_entries.benchmark import SyntheticAddresses
+from nominatim_entries.id_allocator import SequentialIdAllocator
+from nominatim_entries.new_entries import NewEntryXMLActions
+from nominatim_entries.new_entry_model import NewNominatimEntryBatch
+from nominatim_entries.osm_writer import ShardedOsmWriter
+
+SHARD_BYTES = 50_000
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return NewNominatimEntryBatch.from_records(SyntheticAddresses(0).records(3000))
+
+
+def write(batch, path, **options):
+    return asyncio.run(NewEntryXMLActions.create_new_entry(
+        batch, str(path), id_allocator=SequentialIdAllocator(1), rejects=str(path) + ".rejects", **options
+    ))
+
+
+@pytest.mark.parametrize("buffer_size", [16384, 4 * 1024 * 1024])
+def test_xml_shards_stay_within_one_entry_of_shard_bytes(batch, tmp_path, buffer_size):
+    result = write(batch, tmp_path / "out.osm.xml", shard_bytes=SHARD_BYTES, buffer_size=buffer_size)
+    sizes = [os.path.getsize(path) for path in result["files"]]
+
+    assert len(sizes) > 5
+    # One more entry (two nodes) may follow the check, plus the closing tag
+    assert max(sizes) <= SHARD_BYTES + 1000
+    assert min(sizes[:-1]) >= SHARD_BYTES * 0.95
+
+
+@pytest.mark.parametrize("output_format", ["pbf", "gz", "bz2"])
+def test_compressed_shards_stay_near_shard_bytes(batch, tmp_path, output_format):
+    result = write(batch, tmp_path / "out", output_format=output_format, shard_bytes=SHARD_BYTES)
+    sizes = [os.path.getsize(path) for path in result["files"]]
+
+    assert len(sizes) > 1
+    assert max(sizes) <= SHARD_BYTES * 1.05
+
+
+def test_xml_bytes_matches_xml_output(batch, tmp_path):
+    path = str(tmp_path / "out.osm.xml")
+    normalized = NewEntryXMLActions.normalize_batch(batch.slice(0, 200), collect_rejects=True)
+    counted = 0
+    with ShardedOsmWriter(path) as writer:
+        for entry_id, (tags, location) in enumerate(normalized.entries, 1_700_000_000_000):
+            node = NewEntryXMLActions.build_node(tags, location, entry_id)
+            counted += ShardedOsmWriter.xml_bytes(node)
+            writer.add_node(node)
+    size = os.path.getsize(path)
+    # Coordinates are counted at their widest; the header and closing tag are not counted
+    assert counted * 0.97 <= size <= counted + 100
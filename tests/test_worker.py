@@ -0,0 +1,43 @@
+import os
+import stat
+import threading
+
+from multiprocessing import AuthenticationError
+
+import pytest
+
+from nominatim_entries.worker import NormalizationClient, NormalizationServer, read_authkey
+
+
+@pytest.fixture
+def server(tmp_path):
+    key_file = tmp_path / "worker.key"
+    key_file.write_bytes(b"secret\n")
+    server = NormalizationServer(str(tmp_path / "worker.sock"), workers=1, authkey=read_authkey(str(key_file)))
+    server.start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.stop()
+    thread.join(5)
+
+
+def test_socket_is_private_to_its_owner(server):
+    assert stat.S_IMODE(os.stat(server.address).st_mode) == 0o600
+
+
+def test_clients_need_the_authkey(server):
+    with pytest.raises(AuthenticationError):
+        NormalizationClient(server.address, authkey=b"wrong")
+
+    with NormalizationClient(server.address, authkey=b"secret") as client:
+        assert client.parse(["1 Main St"])[0][0]["StreetNamePostType"] == "street"
+
+
+def test_bad_jobs_get_an_error_reply(server):
+    with NormalizationClient(server.address, authkey=b"secret") as client:
+        with pytest.raises(RuntimeError, match="TypeError"):
+            client.request(["parse"])
+        with pytest.raises(RuntimeError, match="executor, id_allocator are set by the server"):
+            client.create_entries([], executor="thread", id_allocator=None)
+        assert client.ping()["pid"] == os.getpid()
@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import stat
+import asyncio
+import argparse
+import threading
+
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from .id_allocator import SequentialIdAllocator
+from .ingest import FeedIngest
+from .new_entries import NewEntryXMLActions
+from .normalization import AddressNormalization, _init_parse_worker, tag
+
+
+class NormalizationServer:
+    """Resident worker that loads usaddress once and serves normalization jobs over a Unix socket.
+
+    Each client connection is handled on its own thread and may send any number of jobs, each a
+    dict with an "op" key:
+
+    - `{"op": "parse", "addresses": [...], "w_street_expansion": True}` returns the `parse_address`
+      results in order.
+    - `{"op": "create_entries", "records": [...], "filename": ..., "options": {...}}` validates the
+      record dicts, writes them with `create_new_entry` and returns its result. These jobs run one
+      at a time and share one node ID allocator, so concurrent clients never reuse IDs.
+    - `{"op": "ping"}` and `{"op": "shutdown"}`.
+
+    Replies are `{"ok": True, "result": ...}` or `{"ok": False, "error": ..., "type": ...}`. With more
+    than one worker, jobs are spread over a process pool whose workers stay warm between jobs.
+
+    Jobs and replies are pickles, so only trusted clients may connect: the socket is only accessible
+    to its owner, and with `authkey` every client must also prove it knows the key.
+    """
+
+    # create_new_entry options a client may not set
+    SERVER_OPTIONS = frozenset({"executor", "id_allocator"})
+
+    def __init__(self, address, workers=None, authkey=None, cache=None, id_allocator=None, chunksize=256):
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.authkey = authkey
+        self.cache = cache
+        self.id_allocator = SequentialIdAllocator.from_timestamp() if id_allocator is None else id_allocator
+        self.chunksize = chunksize
+        self.pool = None
+        self.jobs = 0
+        self._listener = None
+        self._stopping = threading.Event()
+        self._create_lock = threading.Lock()
+
+    def start(self):
+        """Warm up the tagger and the pool and start listening."""
+        if self.cache is not None:
+            AddressNormalization.cache = self.cache
+        _init_parse_worker()
+        if self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            cache_config = None
+            if self.cache is not None:
+                self.cache.flush()
+                cache_config = self.cache.config()
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_parse_worker, initargs=(cache_config,))
+            # Start the workers now instead of on the first job
+            list(self.pool.map(tag, ["1 main st"] * self.workers))
+        self._remove_stale_socket()
+        # Create the socket without group or other access, so there is no window before the chmod
+        umask = os.umask(0o177)
+        try:
+            self._listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        finally:
+            os.umask(umask)
+        os.chmod(self.address, stat.S_IRUSR | stat.S_IWUSR)
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.address):
+            return
+        try:
+            Client(self.address, family="AF_UNIX", authkey=self.authkey).close()
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(self.address)
+        else:
+            raise RuntimeError(f"A worker is already listening on {self.address}")
+
+    def serve_forever(self):
+        if self._listener is None:
+            self.start()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    connection = self._listener.accept()
+                except AuthenticationError:
+                    # A client with the wrong key is turned away without stopping the server
+                    continue
+                except OSError:
+                    if self._stopping.is_set():
+                        break
+                    raise
+                threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+        finally:
+            self.close()
+
+    def _serve_connection(self, connection):
+        with connection:
+            while not self._stopping.is_set():
+                try:
+                    job = connection.recv()
+                except (EOFError, OSError):
+                    return
+                connection.send(self.handle(job))
+                if isinstance(job, dict) and job.get("op") == "shutdown":
+                    self.stop()
+                    return
+
+    def handle(self, job):
+        try:
+            if not isinstance(job, dict):
+                raise TypeError(f"A job is a dict with an \"op\" key, not {type(job).__name__}")
+            operation = job.get("op")
+            if operation == "parse":
+                result = self.parse(job["addresses"], job.get("w_street_expansion", True))
+            elif operation == "create_entries":
+                result = self.create_entries(job["records"], job.get("filename"), **job.get("options", {}))
+            elif operation == "ping":
+                result = {"pid": os.getpid(), "workers": self.workers, "jobs": self.jobs}
+            elif operation == "shutdown":
+                result = None
+            else:
+                raise ValueError(f"Unknown operation {operation!r}")
+        except Exception as error:
+            return {"ok": False, "error": str(error), "type": type(error).__name__}
+        self.jobs += 1
+        return {"ok": True, "result": result}
+
+    def parse(self, addresses, w_street_expansion=True):
+        if self.pool is None:
+            return AddressNormalization.parse_addresses(addresses, w_street_expansion, workers=1)
+        return AddressNormalization.parse_many(
+            addresses, w_street_expansion, self.workers, self.chunksize, executor=self.pool
+        )
+
+    def create_entries(self, records, filename=None, **options):
+        # The server's own pool and allocator are used, so IDs stay unique across clients
+        if reserved := sorted(self.SERVER_OPTIONS.intersection(options)):
+            raise ValueError(f"Options {', '.join(reserved)} are set by the server")
+        batch = FeedIngest.build_batch(records)
+        options.setdefault("parallelism", self.workers)
+        with self._create_lock:
+            return asyncio.run(NewEntryXMLActions.create_new_entry(
+                batch,
+                filename,
+                executor=self.pool or "thread",
+                id_allocator=self.id_allocator,
+                **options,
+            ))
+
+    def stop(self):
+        self._stopping.set()
+        # accept() does not return when the listener is closed from another thread; wake it up
+        try:
+            Client(self.address, family="AF_UNIX", authkey=self.authkey).close()
+        except OSError:
+            pass
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.cache is not None:
+            self.cache.flush()
+
+
+def read_authkey(path):
+    """Read a worker authentication key from a file, without its trailing newline."""
+    with open(path, "rb") as key_file:
+        authkey = key_file.read().rstrip(b"\r\n")
+    if not authkey:
+        raise ValueError(f"Authentication key file {path} is empty")
+    return authkey
+
+
+class NormalizationClient:
+    """Connection to a `NormalizationServer`; raises the server's errors as RuntimeError."""
+
+    def __init__(self, address, authkey=None):
+        self.connection = Client(address, family="AF_UNIX", authkey=authkey)
+
+    def request(self, job):
+        self.connection.send(job)
+        reply = self.connection.recv()
+        if not reply["ok"]:
+            raise RuntimeError(f"{reply['type']}: {reply['error']}")
+        return reply["result"]
+
+    def parse(self, addresses, w_street_expansion=True):
+        return self.request({"op": "parse", "addresses": list(addresses), "w_street_expansion": w_street_expansion})
+
+    def create_entries(self, records, filename=None, **options):
+        """Write record dicts on the server. `filename` is a path on the server's side."""
+        return self.request({"op": "create_entries", "records": list(records), "filename": filename, "options": options})
+
+    def ping(self):
+        return self.request({"op": "ping"})
+
+    def shutdown(self):
+        return self.request({"op": "shutdown"})
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a resident address normalization worker on a Unix socket.")
+    parser.add_argument("socket", help="path of the Unix socket to listen on")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count, 1 runs in-process)")
+    parser.add_argument("--chunksize", type=int, default=256)
+    parser.add_argument("--cache", help="NormalizationCache file shared by all jobs")
+    parser.add_argument(
+        "--authkey-file", help="file holding the key clients must authenticate with (default: no authentication)"
+    )
+    args = parser.parse_args(argv)
+
+    authkey = read_authkey(args.authkey_file) if args.authkey_file else None
+
+    cache = None
+    if args.cache:
+        from .normalization_cache import NormalizationCache
+
+        cache = NormalizationCache(args.cache)
+    server = NormalizationServer(args.socket, args.workers, authkey=authkey, cache=cache, chunksize=args.chunksize)
+    server.start()
+    print(json.dumps({"listening": args.socket, "pid": os.getpid(), "workers": server.workers}), file=sys.stderr)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()